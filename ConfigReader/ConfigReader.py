@@ -2,38 +2,226 @@ import ujson
 import uos
 
 class ConfigReader:
+    """
+    Reads config.json into a flat table of "Section.Key" values.
+
+    The parsed values are kept in CACHE_PATH together with the size and
+    modification time of the config file. As long as those match, later
+    boots read the small line based cache instead of parsing the JSON.
+    The raw JSON document is dropped after the values are extracted.
+    """
 
     CONFIG_PATH = 'config.json'
+    CACHE_PATH = 'config.cache'
+
+    # required keys and their accepted types
+    SCHEMA = (
+        ( "Wifi.SSID", str ),
+        ( "Wifi.Password", str ),
+        ( "Server.IP", str ),
+        ( "Server.Port", ( str, int ) ),
+    )
 
     def __init__( self ):
-        self.m_oData = {}
-        self.m_sWIFI_SSID = ''
-        self.m_sWIFI_Password = ''
-        self.m_sServer_IP = ''
-        self.m_sServer_Port = ''
+        self.m_dValues = {}
+        self.m_tSignature = None
+        self.m_lSubscribers = []
 
     def init( self ):
-        if ConfigReader.CONFIG_PATH not in uos.listdir():
+        tSignature = self._Signature()
+        if tSignature is None:
             return False
 
+        if not self._LoadCache( tSignature ):
+            self._Parse()
+            self._WriteCache( tSignature )
+        self.m_tSignature = tSignature
+
+        self.Validate()
+        return True
+
+    def _Signature( self ):
+        try:
+            oStat = uos.stat( ConfigReader.CONFIG_PATH )
+        except OSError:
+            return None
+        return ( oStat[6], oStat[8] )
+
+    def _Parse( self ):
         with open( ConfigReader.CONFIG_PATH, 'r' ) as oFile:
-            self.m_oData = ujson.load( oFile )
+            oData = ujson.load( oFile )
+        self.m_dValues = {}
+        self._Flatten( '', oData )
 
+    def _Flatten( self, sPrefix, oData ):
+        for sKey, oValue in oData.items():
+            if isinstance( oValue, dict ):
+                self._Flatten( sPrefix + sKey + '.', oValue )
+            else:
+                self.m_dValues[sPrefix + sKey] = oValue
+
+    def _LoadCache( self, tSignature ):
         try:
-            self.m_sWIFI_SSID = self.m_oData["Wifi"]["SSID"]
-            self.m_sWIFI_Password = self.m_oData["Wifi"]["Password"]
-            self.m_sServer_IP = self.m_oData["Server"]["IP"]
-            self.m_sServer_Port = self.m_oData["Server"]["Port"]
-        except KeyError as oError:
-            print(str(oError))
-            raise oError
+            with open( ConfigReader.CACHE_PATH, 'r' ) as oFile:
+                if oFile.readline().rstrip( '\n' ) != '%d,%d' % tSignature:
+                    return False
+                dValues = {}
+                for sLine in oFile:
+                    sKey, sType, sValue = sLine.rstrip( '\n' ).split( '\t', 2 )
+                    dValues[sKey] = ConfigReader._Decode( sType, sValue )
+        except ( OSError, ValueError ):
             return False
-
+        self.m_dValues = dValues
         return True
 
+    def _WriteCache( self, tSignature ):
+        sTemp = ConfigReader.CACHE_PATH + '.tmp'
+        try:
+            with open( sTemp, 'w' ) as oFile:
+                oFile.write( '%d,%d\n' % tSignature )
+                for sKey, oValue in self.m_dValues.items():
+                    sType, sValue = ConfigReader._Encode( oValue )
+                    oFile.write( '%s\t%s\t%s\n' % ( sKey, sType, sValue ) )
+            try:
+                uos.rename( sTemp, ConfigReader.CACHE_PATH )
+            except OSError:
+                uos.remove( ConfigReader.CACHE_PATH )
+                uos.rename( sTemp, ConfigReader.CACHE_PATH )
+        except OSError as oError:
+            # running without the cache only costs the JSON parse
+            print( str( oError ) )
+
+    @staticmethod
+    def _Encode( oValue ):
+        if oValue is None:
+            return ( 'n', '' )
+        if isinstance( oValue, bool ):
+            return ( 'b', '1' if oValue else '' )
+        if isinstance( oValue, int ):
+            return ( 'i', str( oValue ) )
+        if isinstance( oValue, float ):
+            return ( 'f', repr( oValue ) )
+        if isinstance( oValue, str ):
+            return ( 's', oValue.replace( '\\', '\\\\' ).replace( '\n', '\\n' ) )
+        return ( 'j', ujson.dumps( oValue ) )
+
+    @staticmethod
+    def _Decode( sType, sValue ):
+        if sType == 's':
+            if '\\' not in sValue:
+                return sValue
+            lChars = []
+            nIndex = 0
+            while nIndex < len( sValue ):
+                sChar = sValue[nIndex]
+                if sChar == '\\':
+                    nIndex += 1
+                    sChar = '\n' if sValue[nIndex] == 'n' else sValue[nIndex]
+                lChars.append( sChar )
+                nIndex += 1
+            return ''.join( lChars )
+        if sType == 'i':
+            return int( sValue )
+        if sType == 'f':
+            return float( sValue )
+        if sType == 'b':
+            return sValue == '1'
+        if sType == 'n':
+            return None
+        if sType == 'j':
+            return ujson.loads( sValue )
+        raise ValueError( sType )
+
+    def Validate( self ):
+        """
+        Check the required keys of SCHEMA, raises KeyError or TypeError.
+        """
+        for sKey, oType in ConfigReader.SCHEMA:
+            if sKey not in self.m_dValues:
+                raise KeyError( sKey )
+            if not isinstance( self.m_dValues[sKey], oType ):
+                raise TypeError( sKey )
+
+    def Get( self, sSection, sKey, oDefault = None, oType = None ):
+        """
+        Return a value of any section, converted to oType if given.
+
+        oDefault is returned if the key is missing or cannot be converted.
+        """
+        oValue = self.m_dValues.get( sSection + '.' + sKey, oDefault )
+        if oType is None or oValue is oDefault or isinstance( oValue, oType ):
+            return oValue
+        try:
+            return oType( oValue )
+        except ( TypeError, ValueError ):
+            return oDefault
+
+    def GetSection( self, sSection ):
+        """
+        Return all values of a section as a dict.
+        """
+        sPrefix = sSection + '.'
+        return { sKey[len( sPrefix ):]: oValue for sKey, oValue in self.m_dValues.items() if sKey.startswith( sPrefix ) }
+
+    def Subscribe( self, sSection, fnCallback ):
+        """
+        Register fnCallback( oReader, sSection ), called by Poll when values
+        of the section changed.
+        """
+        self.m_lSubscribers.append( ( sSection, fnCallback ) )
+
+    def Poll( self ):
+        """
+        Reload the config if its size or mtime changed and notify the
+        subscribers of the changed sections.
+
+        Returns the list of changed sections. A file which fails to parse or
+        validate is ignored and the previous values are kept.
+        """
+        tSignature = self._Signature()
+        if tSignature is None or tSignature == self.m_tSignature:
+            return []
+
+        # remember the signature even if the file is broken, so it is only
+        # parsed again once it changed again
+        self.m_tSignature = tSignature
+        dOld = self.m_dValues
+        try:
+            self._Parse()
+            self.Validate()
+        except ( OSError, ValueError, KeyError, TypeError ) as oError:
+            print( str( oError ) )
+            self.m_dValues = dOld
+            return []
+        self._WriteCache( tSignature )
+
+        lChanged = []
+        oMissing = object()
+        for sKey in set( dOld ) | set( self.m_dValues ):
+            if dOld.get( sKey, oMissing ) != self.m_dValues.get( sKey, oMissing ):
+                sSection = sKey.rpartition( '.' )[0]
+                if sSection not in lChanged:
+                    lChanged.append( sSection )
+
+        for sSection, fnCallback in self.m_lSubscribers:
+            if sSection in lChanged:
+                fnCallback( self, sSection )
+        return lChanged
+
+    async def Watch( self, nInterval = 2000 ):
+        """
+        uasyncio task calling Poll every nInterval ms.
+        """
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while True:
+            await asyncio.sleep( nInterval / 1000 )
+            self.Poll()
 
     def GetWifiConfig( self ):
-        return ( self.m_sWIFI_SSID, self.m_sWIFI_Password )
+        return ( self.Get( "Wifi", "SSID", '' ), self.Get( "Wifi", "Password", '' ) )
 
     def GetServerConfig( self ):
-        return ( self.m_sServer_IP, self.m_sServer_Port )
+        return ( self.Get( "Server", "IP", '' ), self.Get( "Server", "Port", '' ) )
@@ -0,0 +1,163 @@
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+try:
+    import urandom as random
+except ImportError:
+    import random
+
+class AsyncWifiController:
+    """
+    Non-blocking Wi-Fi connection manager for uasyncio.
+
+    Connect is awaitable and polls the interface between sleeps, so other
+    tasks keep running. Reconnect runs in the background and retries with
+    exponential backoff and jitter after the link is lost. Subscribers are
+    called with the new state on every change.
+
+    A stand-in object with active/connect/isconnected/disconnect can be
+    passed as oWLAN to run without the network module.
+    """
+
+    STATE_IDLE = 0
+    STATE_CONNECTING = 1
+    STATE_CONNECTED = 2
+    STATE_LOST = 3
+
+    POLL_INTERVAL = 100
+    TIMEOUT = 10000
+    BACKOFF_MIN = 500
+    BACKOFF_MAX = 30000
+
+    def __init__( self, oWLAN = None ):
+        self.m_oConnection = oWLAN
+        self.m_nState = AsyncWifiController.STATE_IDLE
+        self.m_lSubscribers = []
+        self.m_sSSID = None
+        self.m_sPassword = None
+        self.m_oTask = None
+        self.m_oAttempt = None
+        self.m_nCheckInterval = 1000
+
+    def init( self ):
+        if self.m_oConnection is None:
+            import network
+            self.m_oConnection = network.WLAN( network.STA_IF )
+        self.m_oConnection.active(True)
+        return self.m_oConnection.active()
+
+    def Subscribe( self, fnCallback ):
+        """
+        Register fnCallback( nState ), called on every state change.
+        """
+        self.m_lSubscribers.append( fnCallback )
+
+    def Unsubscribe( self, fnCallback ):
+        self.m_lSubscribers.remove( fnCallback )
+
+    def GetState( self ):
+        return self.m_nState
+
+    def IsConnected( self ):
+        return self.m_oConnection.isconnected()
+
+    def _SetState( self, nState ):
+        if nState == self.m_nState:
+            return
+        self.m_nState = nState
+        for fnCallback in self.m_lSubscribers:
+            fnCallback( nState )
+
+    async def Connect( self, sSSID, sPassword, nTimeout = None ):
+        """
+        Connect and wait without blocking until connected or timed out.
+        """
+        self.m_sSSID = sSSID
+        self.m_sPassword = sPassword
+        return await self._Attempt( nTimeout or AsyncWifiController.TIMEOUT )
+
+    async def _Attempt( self, nTimeout ):
+        self._SetState( AsyncWifiController.STATE_CONNECTING )
+        self.m_oConnection.connect( self.m_sSSID, self.m_sPassword )
+
+        nWaited = 0
+        while not self.m_oConnection.isconnected():
+            if nWaited >= nTimeout:
+                self._SetState( AsyncWifiController.STATE_LOST )
+                return False
+            await asyncio.sleep( AsyncWifiController.POLL_INTERVAL / 1000 )
+            nWaited += AsyncWifiController.POLL_INTERVAL
+
+        self._SetState( AsyncWifiController.STATE_CONNECTED )
+        return True
+
+    def StartReconnect( self, nCheckInterval = 1000 ):
+        """
+        Start the background task which watches the link and reconnects.
+        """
+        if self.m_oTask is None:
+            self.m_nCheckInterval = nCheckInterval
+            self.m_oTask = asyncio.create_task( self._Watch( nCheckInterval ) )
+        return self.m_oTask
+
+    def StopReconnect( self ):
+        if self.m_oTask is not None:
+            self.m_oTask.cancel()
+            self.m_oTask = None
+
+    async def Reconnect( self, sSSID = None, sPassword = None ):
+        """
+        Drop the current link and connect again, e.g. after new credentials.
+
+        Do not await this while the background task runs, both would
+        connect at once. OnConfigChanged takes care of that.
+        """
+        if sSSID is not None:
+            self.m_sSSID = sSSID
+            self.m_sPassword = sPassword
+        self.m_oConnection.disconnect()
+        self._SetState( AsyncWifiController.STATE_LOST )
+        return await self._Attempt( AsyncWifiController.TIMEOUT )
+
+    def OnConfigChanged( self, oReader, sSection ):
+        """
+        ConfigReader subscriber for the "Wifi" section, reconnects in the
+        background with the new credentials.
+
+        An attempt still running for the old ones is cancelled first, so
+        only one connect loop reports state changes. With the background
+        task running it is restarted and does the reconnect itself.
+        """
+        sSSID, sPassword = oReader.GetWifiConfig()
+        if self.m_oAttempt is not None:
+            self.m_oAttempt.cancel()
+            self.m_oAttempt = None
+        if self.m_oTask is not None:
+            self.StopReconnect()
+            self.m_sSSID = sSSID
+            self.m_sPassword = sPassword
+            self.m_oConnection.disconnect()
+            self._SetState( AsyncWifiController.STATE_LOST )
+            return self.StartReconnect( self.m_nCheckInterval )
+        self.m_oAttempt = asyncio.create_task( self.Reconnect( sSSID, sPassword ) )
+        return self.m_oAttempt
+
+    async def _Watch( self, nCheckInterval ):
+        nBackoff = AsyncWifiController.BACKOFF_MIN
+        while True:
+            if self.m_oConnection.isconnected():
+                self._SetState( AsyncWifiController.STATE_CONNECTED )
+                nBackoff = AsyncWifiController.BACKOFF_MIN
+                nDelay = nCheckInterval
+            else:
+                if self.m_nState == AsyncWifiController.STATE_CONNECTED:
+                    self._SetState( AsyncWifiController.STATE_LOST )
+                if self.m_sSSID is not None and await self._Attempt( AsyncWifiController.TIMEOUT ):
+                    nBackoff = AsyncWifiController.BACKOFF_MIN
+                    nDelay = nCheckInterval
+                else:
+                    # exponential backoff with up to 50% random jitter
+                    nDelay = nBackoff + random.getrandbits( 16 ) % ( nBackoff // 2 + 1 )
+                    nBackoff = min( nBackoff * 2, AsyncWifiController.BACKOFF_MAX )
+            await asyncio.sleep( nDelay / 1000 )
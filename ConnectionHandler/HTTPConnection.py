@@ -0,0 +1,165 @@
+try:
+    import usocket as socket
+except ImportError:
+    import socket
+
+class HTTPConnection:
+    """
+    Minimal HTTP/1.1 client which keeps its socket open between requests.
+
+    Every response body is read completely, so the connection is ready for
+    the next request. A request on a socket the server already closed is
+    retried once on a fresh connection, but only if no byte of a response
+    arrived, so a request the server answered is never sent twice.
+    """
+
+    TIMEOUT = 5
+
+    def __init__( self, sHost, nPort = 80, nTimeout = None ):
+        self.m_sHost = sHost
+        self.m_nPort = nPort
+        self.m_nTimeout = nTimeout or HTTPConnection.TIMEOUT
+        self.m_oSocket = None
+        self.m_oStream = None
+        self.m_nConnects = 0
+        self.m_nRequests = 0
+        self.m_bAnswered = False
+
+    @staticmethod
+    def FromURL( sURL, nPort = None ):
+        """
+        Create a connection from 'http://host[:port]', the port argument wins.
+        """
+        if sURL.startswith( "http://" ):
+            sURL = sURL[7:]
+        sHost, _, sPort = sURL.partition( "/" )[0].partition( ":" )
+        return HTTPConnection( sHost, int( nPort or sPort or 80 ) )
+
+    def _Connect( self ):
+        oAddress = socket.getaddrinfo( self.m_sHost, self.m_nPort )[0][-1]
+        oSocket = socket.socket()
+        try:
+            oSocket.settimeout( self.m_nTimeout )
+            oSocket.connect( oAddress )
+        except OSError:
+            oSocket.close()
+            raise
+        self.m_oSocket = oSocket
+        self.m_oStream = oSocket.makefile( "rb" )
+        self.m_nConnects += 1
+
+    def Close( self ):
+        if self.m_oSocket is not None:
+            self.m_oSocket.close()
+        self.m_oSocket = None
+        self.m_oStream = None
+
+    def Request( self, sMethod, sPath, bBody = None, sContentType = "application/json" ):
+        """
+        Send a request and return ( status, body bytes ).
+
+        Raises OSError if the server cannot be reached.
+        """
+        bReused = self.m_oSocket is not None
+        try:
+            return self._Request( sMethod, sPath, bBody, sContentType )
+        except OSError:
+            self.Close()
+            if not bReused or self.m_bAnswered:
+                raise
+        # the kept socket went stale, try once more on a new one
+        try:
+            return self._Request( sMethod, sPath, bBody, sContentType )
+        except OSError:
+            self.Close()
+            raise
+
+    def _Request( self, sMethod, sPath, bBody, sContentType ):
+        self.m_bAnswered = False
+        if self.m_oSocket is None:
+            self._Connect()
+
+        sHeader = "%s %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n" % ( sMethod, sPath, self.m_sHost )
+        if bBody is not None:
+            sHeader += "Content-Type: %s\r\nContent-Length: %d\r\n" % ( sContentType, len( bBody ) )
+        self.m_oSocket.sendall( ( sHeader + "\r\n" ).encode() )
+        if bBody:
+            self.m_oSocket.sendall( bBody )
+
+        oStream = self.m_oStream
+        while True:
+            nStatus, nLength, bChunked, bClose = self._ReadHead()
+            # skip interim responses like 100 Continue
+            if not 100 <= nStatus < 200 or nStatus == 101:
+                break
+
+        if sMethod == "HEAD" or 100 <= nStatus < 200 or nStatus in ( 204, 304 ):
+            # no body, whatever the headers announce
+            bResponse = b""
+        elif bChunked:
+            lParts = []
+            while True:
+                nSize = int( oStream.readline().split( b";" )[0], 16 )
+                if nSize == 0:
+                    # skip trailers
+                    while oStream.readline() not in ( b"", b"\r\n" ):
+                        pass
+                    break
+                lParts.append( self._ReadExactly( nSize ) )
+                oStream.readline()
+            bResponse = b"".join( lParts )
+        elif nLength is not None:
+            bResponse = self._ReadExactly( nLength )
+        else:
+            # body ends with the connection
+            bResponse = oStream.read()
+            bClose = True
+
+        self.m_nRequests += 1
+        if bClose:
+            self.Close()
+        return ( nStatus, bResponse )
+
+    def _ReadHead( self ):
+        """
+        Read a status line and its headers, returns ( status, content
+        length or None, chunked, close ).
+        """
+        oStream = self.m_oStream
+        bLine = oStream.readline()
+        if bLine:
+            self.m_bAnswered = True
+        lStatus = bLine.split( None, 2 )
+        if len( lStatus ) < 2 or not bLine.endswith( b"\n" ):
+            raise OSError( "connection closed" )
+        nStatus = int( lStatus[1] )
+
+        nLength = None
+        bChunked = False
+        bClose = lStatus[0] == b"HTTP/1.0"
+        while True:
+            bLine = oStream.readline()
+            if not bLine.endswith( b"\n" ):
+                raise OSError( "connection closed" )
+            if bLine == b"\r\n":
+                break
+            bName, _, bValue = bLine.partition( b":" )
+            bName = bName.strip().lower()
+            bValue = bValue.strip().lower()
+            if bName == b"content-length":
+                nLength = int( bValue )
+            elif bName == b"transfer-encoding":
+                bChunked = bValue == b"chunked"
+            elif bName == b"connection":
+                bClose = bValue == b"close"
+        return ( nStatus, nLength, bChunked, bClose )
+
+    def _ReadExactly( self, nSize ):
+        lParts = []
+        while nSize > 0:
+            bPart = self.m_oStream.read( nSize )
+            if not bPart:
+                raise OSError( "connection closed" )
+            lParts.append( bPart )
+            nSize -= len( bPart )
+        return b"".join( lParts )
@@ -0,0 +1,211 @@
+import uos
+try:
+    import ubinascii as binascii
+except ImportError:
+    import binascii
+
+class OfflineQueue:
+    """
+    Append-only store-and-forward log of fixed size records on flash.
+
+    Records go to numbered segment files of SEGMENT_RECORDS records each.
+    Appends are collected in RAM and written WRITE_RECORDS at a time, a
+    full segment is never rewritten and new data always goes to a new
+    file, which spreads the flash wear. At most MAX_SEGMENTS are kept, the
+    oldest one is dropped when more are needed.
+
+    A record holds RECORD_SIZE - 6 bytes of payload, pass nRecordSize to
+    store larger payloads, up to 261 bytes. All segments of a directory
+    must be written with the same record size.
+
+    Each record carries a CRC, so a write torn by a power loss is detected
+    on the next init and reading stops before it. The read position is
+    kept in a small head file which is replaced atomically on Ack.
+    """
+
+    DIRECTORY = "queue"
+    RECORD_SIZE = 64
+    SEGMENT_RECORDS = 64
+    MAX_SEGMENTS = 8
+    WRITE_RECORDS = 8
+    MAGIC = 0xA5
+
+    def __init__( self, sDirectory = None, nRecordSize = None ):
+        self.m_sDirectory = sDirectory or OfflineQueue.DIRECTORY
+        self.m_nRecordSize = nRecordSize or OfflineQueue.RECORD_SIZE
+        if not 7 <= self.m_nRecordSize <= 261:
+            # the payload length is stored in one byte
+            raise ValueError( "record size must be 7 to 261 bytes" )
+        self.m_lSegments = []
+        self.m_lPending = []
+        self.m_nHeadSegment = 0
+        self.m_nHeadRecord = 0
+        self.m_nTailRecords = 0
+        self.m_tPeekEnd = None
+        self.m_nDropped = 0
+
+    def init( self ):
+        try:
+            uos.stat( self.m_sDirectory )
+        except OSError:
+            uos.mkdir( self.m_sDirectory )
+
+        self.m_lSegments = sorted( int( sName[:-4] ) for sName in uos.listdir( self.m_sDirectory ) if sName.endswith( ".seg" ) )
+
+        try:
+            with open( self._HeadPath(), "r" ) as oFile:
+                lHead = oFile.read().split( "," )
+            self.m_nHeadSegment = int( lHead[0] )
+            self.m_nHeadRecord = int( lHead[1] )
+        except ( OSError, ValueError, IndexError ):
+            self.m_nHeadSegment = self.m_lSegments[0] if self.m_lSegments else 0
+            self.m_nHeadRecord = 0
+
+        # segments before the head were acknowledged but not yet removed
+        while self.m_lSegments and self.m_lSegments[0] < self.m_nHeadSegment:
+            self._Remove( self.m_lSegments.pop( 0 ) )
+
+        if self.m_lSegments:
+            nSize = uos.stat( self._Path( self.m_lSegments[-1] ) )[6]
+            self.m_nTailRecords = nSize // self.m_nRecordSize
+            if nSize % self.m_nRecordSize:
+                # torn write, leave the segment as it is and continue in a new one
+                self.m_nTailRecords = OfflineQueue.SEGMENT_RECORDS
+        return True
+
+    def _Path( self, nSegment ):
+        return "%s/%05d.seg" % ( self.m_sDirectory, nSegment )
+
+    def _HeadPath( self ):
+        return self.m_sDirectory + "/head"
+
+    def _Remove( self, nSegment ):
+        self._RemoveFile( self._Path( nSegment ) )
+
+    def _Encode( self, bPayload ):
+        nSpace = self.m_nRecordSize - 6
+        if len( bPayload ) > nSpace:
+            raise ValueError( "record larger than %d bytes" % nSpace )
+        bRecord = bytearray( self.m_nRecordSize )
+        bRecord[0] = OfflineQueue.MAGIC
+        bRecord[1] = len( bPayload )
+        bRecord[2:2 + len( bPayload )] = bPayload
+        nCRC = binascii.crc32( bRecord[0:-4] ) & 0xFFFFFFFF
+        bRecord[-4:] = nCRC.to_bytes( 4, "little" )
+        return bRecord
+
+    def _Decode( self, bRecord ):
+        if len( bRecord ) < self.m_nRecordSize or bRecord[0] != OfflineQueue.MAGIC:
+            return None
+        if binascii.crc32( bRecord[0:-4] ) & 0xFFFFFFFF != int.from_bytes( bRecord[-4:], "little" ):
+            return None
+        return bytes( bRecord[2:2 + bRecord[1]] )
+
+    def Append( self, bPayload ):
+        """
+        Queue a payload of up to record size - 6 bytes, raises ValueError
+        for larger ones.
+        """
+        self.m_lPending.append( self._Encode( bPayload ) )
+        if len( self.m_lPending ) >= OfflineQueue.WRITE_RECORDS:
+            self.Sync()
+
+    def Sync( self ):
+        """
+        Write the records collected in RAM to flash.
+        """
+        while self.m_lPending:
+            if not self.m_lSegments or self.m_nTailRecords >= OfflineQueue.SEGMENT_RECORDS:
+                self._NewSegment()
+            nCount = min( len( self.m_lPending ), OfflineQueue.SEGMENT_RECORDS - self.m_nTailRecords )
+            with open( self._Path( self.m_lSegments[-1] ), "ab" ) as oFile:
+                oFile.write( b"".join( self.m_lPending[:nCount] ) )
+            self.m_lPending = self.m_lPending[nCount:]
+            self.m_nTailRecords += nCount
+
+    def _NewSegment( self ):
+        nSegment = self.m_lSegments[-1] + 1 if self.m_lSegments else self.m_nHeadSegment
+        self.m_lSegments.append( nSegment )
+        self.m_nTailRecords = 0
+        if len( self.m_lSegments ) > OfflineQueue.MAX_SEGMENTS:
+            # out of space, drop the oldest segment
+            nOldest = self.m_lSegments.pop( 0 )
+            self.m_nDropped += OfflineQueue.SEGMENT_RECORDS - ( self.m_nHeadRecord if nOldest == self.m_nHeadSegment else 0 )
+            self._Remove( nOldest )
+            if nOldest >= self.m_nHeadSegment:
+                self.m_nHeadSegment = self.m_lSegments[0]
+                self.m_nHeadRecord = 0
+                self._WriteHead()
+
+    def Peek( self, nMax ):
+        """
+        Return up to nMax queued payloads from the head, oldest first.
+
+        Pending records are written first. Call Ack once they are delivered.
+        """
+        self.Sync()
+        lPayloads = []
+        nSegment = self.m_nHeadSegment
+        nRecord = self.m_nHeadRecord
+        for nCurrent in self.m_lSegments:
+            if nCurrent < nSegment:
+                continue
+            if nCurrent > nSegment:
+                nSegment = nCurrent
+                nRecord = 0
+            with open( self._Path( nCurrent ), "rb" ) as oFile:
+                oFile.seek( nRecord * self.m_nRecordSize )
+                while len( lPayloads ) < nMax:
+                    bPayload = self._Decode( oFile.read( self.m_nRecordSize ) )
+                    if bPayload is None:
+                        # end of segment or torn record, continue in the next one
+                        nRecord = OfflineQueue.SEGMENT_RECORDS
+                        break
+                    lPayloads.append( bPayload )
+                    nRecord += 1
+            if len( lPayloads ) >= nMax:
+                break
+        self.m_tPeekEnd = ( nSegment, nRecord )
+        return lPayloads
+
+    def Ack( self ):
+        """
+        Drop the payloads returned by the last Peek and free their segments.
+        """
+        if self.m_tPeekEnd is None:
+            return
+        self.m_nHeadSegment, self.m_nHeadRecord = self.m_tPeekEnd
+        self.m_tPeekEnd = None
+
+        bTail = self.m_lSegments and self.m_nHeadSegment == self.m_lSegments[-1]
+        if self.m_nHeadRecord >= OfflineQueue.SEGMENT_RECORDS or ( bTail and self.m_nHeadRecord >= self.m_nTailRecords ):
+            # the head segment is used up, start after it
+            self.m_nHeadSegment += 1
+            self.m_nHeadRecord = 0
+        self._WriteHead()
+
+        while self.m_lSegments and self.m_lSegments[0] < self.m_nHeadSegment:
+            self._Remove( self.m_lSegments.pop( 0 ) )
+
+    def _WriteHead( self ):
+        sPath = self._HeadPath()
+        with open( sPath + ".tmp", "w" ) as oFile:
+            oFile.write( "%d,%d" % ( self.m_nHeadSegment, self.m_nHeadRecord ) )
+        try:
+            uos.rename( sPath + ".tmp", sPath )
+        except OSError:
+            self._RemoveFile( sPath )
+            uos.rename( sPath + ".tmp", sPath )
+
+    def _RemoveFile( self, sPath ):
+        try:
+            uos.remove( sPath )
+        except OSError:
+            pass
+
+    def IsEmpty( self ):
+        if self.m_lPending:
+            return False
+        if not self.m_lSegments:
+            return True
+        return self.m_nHeadSegment == self.m_lSegments[-1] and self.m_nHeadRecord >= self.m_nTailRecords
@@ -1,17 +1,140 @@
-import urequests
+try:
+    import ujson as json
+except ImportError:
+    import json
+try:
+    from utime import ticks_ms, ticks_diff
+except ImportError:
+    import time
+    def ticks_ms():
+        return int( time.time() * 1000 )
+    def ticks_diff( nA, nB ):
+        return nA - nB
+from .HTTPConnection import HTTPConnection
 
 class ServerController:
 
+    UPLOAD_PATH = "/readings"
+    BATCH_SIZE = 16
+    QUEUE_CAPACITY = 64
+    FLUSH_INTERVAL = 30000
+    REPLAY_BATCH = 32
+
     def __init__( self ):
-        pass
+        self.m_oConnection = None
+        self.m_oOfflineQueue = None
+        self.m_lQueue = []
+        self.m_nDropped = 0
+        self.m_nLastFlush = None
 
     def init( self, sIP, sPort ):
+        self.Close()
+        self.m_oConnection = HTTPConnection.FromURL( sIP, sPort )
         try:
-            oRequest = urequests.get( sIP + ":" + sPort )
+            nStatus, bBody = self.m_oConnection.Request( "GET", "/" )
         except OSError as oException:
             return False
 
-        if oRequest.text == "Hello, World!":
+        if bBody == b"Hello, World!":
+            self.Replay()
             return True
         else:
             return False
+
+    def OnConfigChanged( self, oReader, sSection ):
+        """
+        ConfigReader subscriber for the "Server" section, reconnects to the
+        new address.
+        """
+        sIP, sPort = oReader.GetServerConfig()
+        return self.init( sIP, str( sPort ) )
+
+    def SetOfflineQueue( self, oQueue ):
+        """
+        Keep readings which could not be uploaded in an OfflineQueue and
+        send them once the server is reachable again.
+        """
+        self.m_oOfflineQueue = oQueue
+
+    def Close( self ):
+        if self.m_oConnection is not None:
+            self.m_oConnection.Close()
+
+    def Queue( self, oReading ):
+        """
+        Buffer a reading for the next batch upload.
+
+        When the buffer is full the oldest reading is dropped.
+        """
+        self.m_lQueue.append( oReading )
+        if len( self.m_lQueue ) > ServerController.QUEUE_CAPACITY:
+            self.m_lQueue.pop( 0 )
+            self.m_nDropped += 1
+
+    def Poll( self ):
+        """
+        Upload the buffered readings if the batch is full or the flush
+        interval has passed. Call this regularly from the main loop.
+        """
+        if not self.m_lQueue:
+            return True
+        nNow = ticks_ms()
+        if self.m_nLastFlush is None:
+            self.m_nLastFlush = nNow
+        if len( self.m_lQueue ) < ServerController.BATCH_SIZE and \
+                ticks_diff( nNow, self.m_nLastFlush ) < ServerController.FLUSH_INTERVAL:
+            return True
+        return self.Flush()
+
+    def Flush( self ):
+        """
+        Send all buffered readings in one request.
+
+        The readings are kept if the server cannot be reached or rejects them.
+        With an offline queue they are moved to flash instead, readings too
+        large for its records are dropped and counted in m_nDropped.
+        """
+        self.m_nLastFlush = ticks_ms()
+        if not self.m_lQueue or self.m_oConnection is None:
+            return not self.m_lQueue
+
+        lBatch = self.m_lQueue[:]
+        if not self.Upload( lBatch ):
+            if self.m_oOfflineQueue is not None:
+                # move the readings to flash instead of losing them
+                for oReading in lBatch:
+                    try:
+                        self.m_oOfflineQueue.Append( json.dumps( oReading ).encode() )
+                    except ValueError:
+                        self.m_nDropped += 1
+                self.m_oOfflineQueue.Sync()
+                self.m_lQueue = self.m_lQueue[len( lBatch ):]
+            return False
+        self.m_lQueue = self.m_lQueue[len( lBatch ):]
+        self.Replay()
+        return True
+
+    def Replay( self ):
+        """
+        Upload the readings stored in the offline queue in large batches,
+        each batch is removed from flash once the server confirmed it.
+        """
+        oQueue = self.m_oOfflineQueue
+        if oQueue is None or self.m_oConnection is None:
+            return True
+        while not oQueue.IsEmpty():
+            lPayloads = oQueue.Peek( ServerController.REPLAY_BATCH )
+            if lPayloads and not self.Upload( [json.loads( bPayload ) for bPayload in lPayloads] ):
+                return False
+            oQueue.Ack()
+        return True
+
+    def Upload( self, lReadings ):
+        """
+        POST a list of readings as one JSON array, returns True on success.
+        """
+        try:
+            nStatus, bBody = self.m_oConnection.Request( "POST", ServerController.UPLOAD_PATH, json.dumps( lReadings ).encode() )
+        except OSError as oException:
+            return False
+        return 200 <= nStatus < 300
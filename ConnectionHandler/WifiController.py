@@ -32,3 +32,12 @@ class WifiController:
 
     def IsConnected( self ):
         return self.m_oConnection.isconnected()
+
+    def OnConfigChanged( self, oReader, sSection ):
+        """
+        ConfigReader subscriber for the "Wifi" section, reconnects with the
+        new credentials.
+        """
+        sSSID, sPassword = oReader.GetWifiConfig()
+        self.m_oConnection.disconnect()
+        return self.ConnectToWifi( sSSID, sPassword )
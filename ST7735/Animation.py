@@ -0,0 +1,162 @@
+# MicroPython Driver TFT animation frame scheduler
+import time
+from .Bus import CountingSPI
+
+
+class FrameScheduler(object):
+    """
+    Fixed rate animation loop on a buffered TFT.
+
+    Every frame the draw callbacks render into the framebuffer, nothing
+    reaches the panel while they run. The changed areas are then flushed
+    in one burst, right after the panel's tearing effect signal if a TE
+    pin is given. The frame is rendered band by band through render_bands,
+    ROWS rows at a time by default, each band is one burst. A band of 16
+    rows on a 128 pixel wide panel takes 4 KB. rows=None buffers the whole
+    screen, 40 KB for 128x160, which only fits on the host or on ports
+    with much more RAM than the ESP8266.
+
+    In full screen mode the framebuffer does not know what was drawn
+    before the scheduler enabled it and the first flush sends all of it,
+    so draw the static parts in frame 0.
+
+    Frames which would start later than one interval after their slot are
+    dropped instead of being drawn late, so the animation keeps its speed
+    and the CPU time per second stays bounded.
+
+    stats() returns (frames, dropped, last frame us, max frame us, last
+    flush us, last flush bytes, bus utilization in percent), where the
+    utilization is the flush time of the last frame relative to the
+    frame interval.
+    """
+
+    TE_TIMEOUT = 20000
+    ROWS = 16
+
+    def __init__(self, tft, fps=20, rows=ROWS, te=None):
+        self.tft = tft
+        self.interval = 1000000 // fps
+        self.rows = rows
+        self.te = te
+        self.draws = []
+        self.running = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames = 0
+        self.dropped = 0
+        self.frame_us = 0
+        self.max_frame_us = 0
+        self.flush_us = 0
+        self.flush_bytes = 0
+
+    def add(self, draw):
+        """
+        Register draw(tft, frame), called once per frame, or once per band.
+        """
+        self.draws.append(draw)
+
+    def remove(self, draw):
+        self.draws.remove(draw)
+
+    def _draw(self, tft):
+        for draw in self.draws:
+            draw(tft, self.frames)
+
+    def _wait_te(self):
+        # the panel raises TE during vertical blanking
+        te = self.te
+        start = time.ticks_us()
+        while te.value() and time.ticks_diff(time.ticks_us(), start) < FrameScheduler.TE_TIMEOUT:
+            pass
+        while not te.value() and time.ticks_diff(time.ticks_us(), start) < FrameScheduler.TE_TIMEOUT:
+            pass
+
+    def frame(self):
+        """
+        Render and flush one frame now.
+        """
+        tft = self.tft
+        if not tft.buffered():
+            tft.buffered(True, self.rows)
+        start = time.ticks_us()
+
+        spi = tft.spi
+        counter = CountingSPI(spi)
+        if self.rows is None or self.rows >= tft.height:
+            self._draw(tft)
+            if self.te is not None:
+                self._wait_te()
+            flush_start = time.ticks_us()
+            tft.spi = counter
+            try:
+                tft.flush()
+            finally:
+                tft.spi = spi
+            self.flush_us = time.ticks_diff(time.ticks_us(), flush_start)
+        else:
+            flush_start = start
+            tft.spi = counter
+            try:
+                tft.render_bands(self._draw)
+            finally:
+                tft.spi = spi
+            # drawing and flushing alternate per band, count it all
+            self.flush_us = time.ticks_diff(time.ticks_us(), flush_start)
+
+        self.flush_bytes = counter.bytes
+        self.frame_us = time.ticks_diff(time.ticks_us(), start)
+        self.max_frame_us = max(self.max_frame_us, self.frame_us)
+        self.frames += 1
+
+    def _next(self, deadline):
+        """
+        Return the start of the next frame slot, counting skipped slots
+        as dropped frames.
+        """
+        deadline = time.ticks_add(deadline, self.interval)
+        late = time.ticks_diff(time.ticks_us(), deadline)
+        if late >= self.interval:
+            missed = late // self.interval
+            self.dropped += missed
+            deadline = time.ticks_add(deadline, missed * self.interval)
+        return deadline
+
+    def run(self, frames=None):
+        """
+        Run the loop until stop() or for the given number of frames.
+        """
+        self.running = True
+        deadline = time.ticks_us()
+        count = 0
+        while self.running and (frames is None or count < frames):
+            self.frame()
+            count += 1
+            deadline = self._next(deadline)
+            wait = time.ticks_diff(deadline, time.ticks_us())
+            if wait > 0:
+                time.sleep_us(wait)
+
+    async def task(self):
+        """
+        uasyncio version of run, other tasks run while waiting for the
+        next frame slot.
+        """
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        self.running = True
+        deadline = time.ticks_us()
+        while self.running:
+            self.frame()
+            deadline = self._next(deadline)
+            wait = time.ticks_diff(deadline, time.ticks_us())
+            await asyncio.sleep(max(0, wait) / 1000000)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        return (self.frames, self.dropped, self.frame_us, self.max_frame_us,
+                self.flush_us, self.flush_bytes, self.flush_us * 100 // self.interval)
@@ -0,0 +1,361 @@
+# MicroPython Driver TFT display benchmarks
+import time
+from . import Display
+from . import Fonts
+from . import Color
+from .TransferQueue import TransferQueue
+from .Bus import CountingSPI
+from .HostBus import HostBus
+
+
+def _per_pixel_writer(drv):
+    """
+    Reference implementation of the old one-write-per-pixel fill.
+    """
+    def write_pixels(count, color):
+        drv._set_dc(1)
+        drv._select()
+        for _ in range(count):
+            drv.spi.write(color)
+        drv._deselect()
+    return write_pixels
+
+
+FILL_SCENES = (
+    ('Clear', lambda tft: tft.Clear(Display.COLOR_WHITE)),
+    ('Rect',  lambda tft: tft.Rect(10, 10, 60, 40, Display.COLOR_RED)),
+    ('HLine', lambda tft: tft.HLine(0, 20, tft.width, Display.COLOR_BLUE)),
+    ('VLine', lambda tft: tft.VLine(20, 0, tft.height, Display.COLOR_GREEN)),
+)
+
+
+def _measure(tft, counter, scene):
+    counter.reset()
+    start = time.ticks_us()
+    scene(tft)
+    return (counter.calls, counter.bytes, time.ticks_diff(time.ticks_us(), start))
+
+
+def run_fill(tft, forward=False):
+    """
+    Run the fill scenes with per-pixel writes (before) and bulk fills (after).
+
+    Returns a list of (name, before, after) where before/after are
+    (spi calls, bytes, microseconds) tuples. With forward set the data is
+    also sent to the panel, otherwise only the counters see it.
+    """
+    spi = tft.spi
+    counter = CountingSPI(spi if forward else None)
+    tft.spi = counter
+    results = []
+    try:
+        for name, scene in FILL_SCENES:
+            tft.write_pixels = _per_pixel_writer(tft)
+            before = _measure(tft, counter, scene)
+            del tft.write_pixels
+            after = _measure(tft, counter, scene)
+            results.append((name, before, after))
+    finally:
+        if 'write_pixels' in tft.__dict__:
+            del tft.write_pixels
+        tft.spi = spi
+    return results
+
+
+def report(results):
+    """
+    Print a before/after table of benchmark results.
+    """
+    print('%-8s %10s %10s %10s %10s %10s %10s' % (
+        'scene', 'calls', 'bytes', 'us', 'calls*', 'bytes*', 'us*'))
+    for name, before, after in results:
+        print('%-8s %10d %10d %10d %10d %10d %10d' % ((name,) + before + after))
+
+
+def init_delay_ms(table):
+    """
+    Sum of the delays scheduled by a panel init table.
+    """
+    total = 0
+    i = 0
+    while i < len(table):
+        count = table[i + 1]
+        i += 2 + (count & ~Display.Driver.INIT_DELAY)
+        if count & Display.Driver.INIT_DELAY:
+            total += table[i]
+            i += 1
+    return total
+
+
+def run_init(tft, table=None, forward=False):
+    """
+    Time a hard reset plus panel init.
+
+    Returns (spi calls, bytes, scheduled delay ms, wall time ms).
+    """
+    table = table or Display.Driver.INIT_TABLE
+    spi = tft.spi
+    counter = CountingSPI(spi if forward else None)
+    tft.spi = counter
+    try:
+        start = time.ticks_ms()
+        tft.reset()
+        tft.init_panel(table)
+        elapsed = time.ticks_diff(time.ticks_ms(), start)
+    finally:
+        tft.spi = spi
+    return (counter.calls, counter.bytes, init_delay_ms(table), elapsed)
+
+
+
+def host_tft(width=128, height=160):
+    """
+    TFT on a simulated HostBus panel.
+    """
+    return Display.TFT(width, height, 1, None, None, None, bus=HostBus(width, height))
+
+
+def _text_page(tft, _):
+    line = 'The quick brown fox 0'
+    for row in range(tft.height // 10):
+        tft.Text(0, row * 10, line, Fonts.terminalfont, Display.COLOR_BLACK, 1, Display.COLOR_WHITE)
+
+
+def _circles(tft, _):
+    for r in range(4, 60, 8):
+        tft.Circle(64, 80, r, Display.COLOR_BLUE)
+    tft.CircleFilled(32, 32, 20, Display.COLOR_BLACK, Display.COLOR_RED)
+    tft.CircleFilled(96, 128, 20, Display.COLOR_BLACK)
+
+
+def _lines(tft, _):
+    for x in range(0, tft.width, 16):
+        tft.Line(x, 0, tft.width - 1 - x, tft.height - 1, Display.COLOR_GREEN)
+    for y in range(0, tft.height, 16):
+        tft.Line(0, y, tft.width - 1, tft.height - 1 - y, Display.COLOR_RED)
+
+
+def _thermometer(tft):
+    from ESP8266Libraries.Widgets import Gauges
+    tft.Clear(Display.COLOR_WHITE)
+    return Gauges.Thermometer(tft)
+
+
+def _thermometer_ready(tft):
+    thermometer = _thermometer(tft)
+    thermometer.init()
+    thermometer.SetTemperature(20)
+    return thermometer
+
+
+def _thermometer_init(tft, thermometer):
+    thermometer.init()
+    thermometer.SetTemperature(20)
+
+
+def _thermometer_updates(tft, thermometer):
+    for temp in (20.5, 21, 22.5, 19, 18.5, 25, 15, 20):
+        thermometer.SetTemperature(temp)
+
+
+# (name, setup, scene), setup runs before the counters start and its
+# result is passed to the scene
+SCENES = (
+    ('clear',       None,               lambda tft, _: tft.Clear(Display.COLOR_BLACK)),
+    ('text',        None,               _text_page),
+    ('circles',     None,               _circles),
+    ('lines',       None,               _lines),
+    ('thermo_init', _thermometer,       _thermometer_init),
+    ('thermo_upd',  _thermometer_ready, _thermometer_updates),
+)
+
+# (spi calls, bytes, window setups) per scene, the current baseline.
+# Lower them along with any change that improves a scene.
+BUDGETS = {
+    'clear':       (165, 40971, 1),
+    'text':        (1408, 39514, 336),
+    'circles':     (4196, 14102, 834),
+    'lines':       (7722, 19309, 1287),
+    'thermo_init': (580, 7098, 110),
+    'thermo_upd':  (159, 12754, 27),
+}
+
+
+def run_scenes(scenes=SCENES):
+    """
+    Run each scene on a fresh host panel.
+
+    Returns a list of (name, spi calls, bytes, window setups, microseconds).
+    """
+    results = []
+    for name, setup, scene in scenes:
+        tft = host_tft()
+        state = setup(tft) if setup is not None else None
+        bus = tft.bus
+        bus.reset_counters()
+        start = time.ticks_us()
+        scene(tft, state)
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        calls, size = bus.totals()
+        results.append((name, calls, size, bus.windows, elapsed))
+    return results
+
+
+def check(results, budgets=BUDGETS):
+    """
+    Return (name, field, value, budget) for every budget exceeded.
+    """
+    failures = []
+    for result in results:
+        budget = budgets.get(result[0])
+        if budget is None:
+            continue
+        for field, value, limit in zip(('calls', 'bytes', 'windows'), result[1:4], budget):
+            if value > limit:
+                failures.append((result[0], field, value, limit))
+    return failures
+
+
+def report_scenes(results, budgets=BUDGETS):
+    """
+    Print the scene results next to their budgets.
+    """
+    print('%-12s %8s %8s %8s %8s %8s %8s %8s' % (
+        'scene', 'calls', 'bytes', 'windows', 'us', 'calls<', 'bytes<', 'windows<'))
+    for result in results:
+        budget = budgets.get(result[0], (0, 0, 0))
+        print('%-12s %8d %8d %8d %8d %8d %8d %8d' % (result + budget))
+
+
+def run(budgets=BUDGETS):
+    """
+    Run the scene set, print the report and raise AssertionError if a
+    budget is exceeded, e.g. from CI on the unix port.
+    """
+    results = run_scenes()
+    report_scenes(results, budgets)
+    failures = check(results, budgets)
+    if failures:
+        raise AssertionError('budget exceeded: ' + ', '.join(
+            '%s %s %d > %d' % failure for failure in failures))
+    return results
+
+
+def run_color(pixels=2048):
+    """
+    Convert an RGB888 and a gray buffer pixel by pixel through
+    TFT.rgbcolor and bytearray([c >> 8, c]) (before) and with the bulk
+    converters of Color (after).
+
+    Returns a list of (name, before us, after us).
+    """
+    tft = host_tft()
+    rgb = bytes(i & 0xFF for i in range(pixels * 3))
+    gray = bytes(i & 0xFF for i in range(pixels))
+    results = []
+
+    start = time.ticks_us()
+    for i in range(0, len(rgb), 3):
+        c = tft.rgbcolor(rgb[i], rgb[i + 1], rgb[i + 2])
+        bytearray([c >> 8, c])
+    before = time.ticks_diff(time.ticks_us(), start)
+    start = time.ticks_us()
+    Color.rgb888_to_565(rgb)
+    results.append(('rgb888', before, time.ticks_diff(time.ticks_us(), start)))
+
+    start = time.ticks_us()
+    for v in gray:
+        c = tft.rgbcolor(v, v, v)
+        bytearray([c >> 8, c])
+    before = time.ticks_diff(time.ticks_us(), start)
+    start = time.ticks_us()
+    Color.gray_to_565(gray)
+    results.append(('gray', before, time.ticks_diff(time.ticks_us(), start)))
+    return results
+
+
+def run_indexed(bpps=(1, 2, 4, 8)):
+    """
+    Draw the same scene into a full screen FrameBuffer and into indexed
+    surfaces and flush them.
+
+    Returns a list of (name, buffer bytes, flush spi calls, flush bytes, us).
+    """
+    palette = (Display.COLOR_WHITE, Display.COLOR_BLACK, Display.COLOR_RED, Display.COLOR_BLUE)
+    results = []
+
+    tft = host_tft()
+    tft.buffered(True)
+    tft.Clear(Display.COLOR_WHITE)
+    tft.Rect(10, 10, 60, 40, Display.COLOR_BLACK)
+    tft.Rect(40, 80, 70, 50, Display.COLOR_RED)
+    tft.bus.reset_counters()
+    start = time.ticks_us()
+    tft.flush()
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    results.append(('rgb565', len(tft.framebuffer.buf)) + tft.bus.totals() + (elapsed,))
+
+    for bpp in bpps:
+        tft = host_tft()
+        surface = Color.IndexedSurface(tft.width, tft.height, bpp, palette[:1 << bpp])
+        surface.fill(0)
+        surface.fill_rect(10, 10, 60, 40, 1)
+        surface.fill_rect(40, 80, 70, 50, min(2, (1 << bpp) - 1))
+        tft.bus.reset_counters()
+        start = time.ticks_us()
+        surface.flush(tft)
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        results.append(('%d bit' % bpp, len(surface.buf)) + tft.bus.totals() + (elapsed,))
+    return results
+
+
+class SlowSPI(CountingSPI):
+    """
+    CountingSPI which blocks for the time the bytes take on a real bus
+    and forwards them, e.g. to a HostBus.
+    """
+
+    def __init__(self, spi, baudrate=8000000):
+        CountingSPI.__init__(self, spi)
+        self.baudrate = baudrate
+
+    def write(self, data):
+        time.sleep_us(len(data) * 8000000 // self.baudrate)
+        CountingSPI.write(self, data)
+
+
+def run_queue(scene=_lines, baudrate=8000000):
+    """
+    Draw a scene directly, through a TransferQueue drained at the end,
+    and through one drained by a thread, each on a SlowSPI.
+
+    Returns a list of (name, spi writes, CS bursts, us, panel matches
+    the direct one). The queue shows as fewer CS bursts, the drawing
+    scenes make about as many writes either way. Overlap shows as less
+    time with the thread. The thread entry is missing without _thread.
+    """
+    results = []
+    tft = host_tft()
+    tft.spi = SlowSPI(tft.spi, baudrate)
+    start = time.ticks_us()
+    scene(tft, None)
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    reference = bytes(tft.bus.ram)
+    results.append(('direct', tft.spi.calls, tft.spi.calls, elapsed, True))
+
+    for threaded in (False, True):
+        tft = host_tft()
+        tft.spi = SlowSPI(tft.spi, baudrate)
+        queue = TransferQueue(tft)
+        queue.attach()
+        if threaded and not queue.start_thread():
+            queue.detach()
+            break
+        start = time.ticks_us()
+        scene(tft, None)
+        queue.flush()
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        queue.detach()
+        results.append(('thread' if threaded else 'queue', tft.spi.calls, queue.bursts, elapsed,
+                        bytes(tft.bus.ram) == reference))
+    return results
@@ -0,0 +1,39 @@
+# MicroPython Driver TFT hardware bus and SPI wrappers
+
+class MachineBus(object):
+    """
+    Hardware SPI bus and control pins of the board.
+
+    machine is only imported here, so the rest of the driver also runs
+    where it is missing, e.g. on the unix port with a HostBus.
+    """
+
+    def __init__(self, spi_id, dc, cs, rst, baudrate=8000000):
+        from machine import SPI, Pin
+        self.spi = SPI(spi_id, baudrate=baudrate, polarity=1, phase=0)
+        self.dc  = Pin(dc, Pin.OUT)
+        self.cs  = Pin(cs, Pin.OUT)
+        self.rst = Pin(rst, Pin.OUT)
+
+
+class CountingSPI(object):
+    """
+    SPI stand-in that counts write calls and bytes.
+
+    If a real bus is given the data is forwarded to it, otherwise the
+    transfer is dropped and only the counters are updated.
+    """
+
+    def __init__(self, spi=None):
+        self.spi = spi
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.bytes = 0
+
+    def write(self, data):
+        self.calls += 1
+        self.bytes += len(data)
+        if self.spi is not None:
+            self.spi.write(data)
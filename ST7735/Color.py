@@ -0,0 +1,220 @@
+# MicroPython Driver TFT color conversion and indexed surfaces
+try:
+    from . import ColorNative as _native
+except (ImportError, SyntaxError, NameError):
+    # no viper on this port
+    _native = None
+
+
+def rgb565(r, g, b):
+    """
+    Pack 24-bit RGB into 16-bit value.
+    """
+    return ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+
+
+def to_bytes(color):
+    """
+    Return a 16-bit color as the 2 big endian bytes sent to the panel.
+    """
+    return bytes((color >> 8, color & 0xFF))
+
+
+def rgb888_to_565(src, dst=None):
+    """
+    Convert a buffer of packed RGB888 pixels to big endian RGB565.
+
+    dst is filled if given, it needs 2 bytes per pixel. Returns dst.
+    """
+    count = len(src) // 3
+    if dst is None:
+        dst = bytearray(count * 2)
+    if _native is not None:
+        _native.rgb888_to_565(src, dst, count)
+        return dst
+    j = 0
+    for i in range(0, count * 3, 3):
+        g = src[i + 1]
+        dst[j] = (src[i] & 0xF8) | (g >> 5)
+        dst[j + 1] = ((g << 3) & 0xE0) | (src[i + 2] >> 3)
+        j += 2
+    return dst
+
+
+_gray_table = None
+
+def gray_to_565(src, dst=None):
+    """
+    Convert a buffer of 8-bit gray pixels to big endian RGB565.
+
+    dst is filled if given, it needs 2 bytes per pixel. Returns dst.
+    """
+    global _gray_table
+    count = len(src)
+    if dst is None:
+        dst = bytearray(count * 2)
+    if _native is not None:
+        _native.gray_to_565(src, dst, count)
+        return dst
+    if _gray_table is None:
+        _gray_table = [to_bytes(rgb565(v, v, v)) for v in range(256)]
+    table = _gray_table
+    mv = memoryview(dst)
+    j = 0
+    for v in src:
+        mv[j:j + 2] = table[v]
+        j += 2
+    return dst
+
+
+class IndexedSurface(object):
+    """
+    Off-screen surface of 1, 2, 4 or 8 bit palette indices.
+
+    Pixels are packed most significant bits first, rows start on a byte.
+    The touched area is expanded to RGB565 through the palette only when
+    it is flushed, a few rows at a time, so a full 128x160 screen needs
+    2.5 KB at 1 bit or 10 KB at 4 bit instead of 40 KB.
+
+    The expansion looks up whole bytes (4 and 8 bit) or nibbles (1 and
+    2 bit) in a table built from the palette.
+    """
+
+    def __init__(self, width, height, bpp, palette, rows=8):
+        if bpp not in (1, 2, 4, 8):
+            raise ValueError('bpp must be 1, 2, 4 or 8')
+        self.width = width
+        self.height = height
+        self.bpp = bpp
+        self.per_byte = 8 // bpp
+        self.stride = (width + self.per_byte - 1) // self.per_byte
+        self.buf = bytearray(self.stride * height)
+        self.rows = max(1, min(rows, height))
+        self._band = None
+        self.dirty = None
+        self.set_palette(palette)
+
+    def set_palette(self, palette):
+        """
+        Set the RGB565 colors of the indices and mark the surface dirty.
+        """
+        bpp = self.bpp
+        if len(palette) > 1 << bpp:
+            raise ValueError('palette larger than %d colors' % (1 << bpp))
+        self.palette = list(palette) + [0] * ((1 << bpp) - len(palette))
+        bits = 8 if bpp >= 4 else 4
+        mask = (1 << bpp) - 1
+        table = []
+        for unit in range(1 << bits):
+            entry = b''
+            for shift in range(bits - bpp, -1, -bpp):
+                entry += to_bytes(self.palette[(unit >> shift) & mask])
+            table.append(entry)
+        self._table = table
+        self._nibbles = bits == 4
+        self.dirty = (0, 0, self.width - 1, self.height - 1)
+
+    def _mark(self, x0, y0, x1, y1):
+        if self.dirty is None:
+            self.dirty = (x0, y0, x1, y1)
+        else:
+            d = self.dirty
+            self.dirty = (min(d[0], x0), min(d[1], y0), max(d[2], x1), max(d[3], y1))
+
+    def pixel(self, x, y, index):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return
+        self._set(x, y, index)
+        self._mark(x, y, x, y)
+
+    def _set(self, x, y, index):
+        i = y * self.stride + x // self.per_byte
+        shift = 8 - self.bpp * (x % self.per_byte + 1)
+        mask = ((1 << self.bpp) - 1) << shift
+        self.buf[i] = (self.buf[i] & ~mask) | ((index << shift) & mask)
+
+    def get(self, x, y):
+        """
+        Return the palette index at x, y.
+        """
+        shift = 8 - self.bpp * (x % self.per_byte + 1)
+        return (self.buf[y * self.stride + x // self.per_byte] >> shift) & ((1 << self.bpp) - 1)
+
+    def fill(self, index):
+        self.fill_rect(0, 0, self.width, self.height, index)
+
+    def fill_rect(self, x, y, w, h, index):
+        """
+        Fill a rectangle with a palette index, clipped to the surface.
+        """
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width) - 1
+        y1 = min(y + h, self.height) - 1
+        if x0 > x1 or y0 > y1:
+            return
+
+        per_byte = self.per_byte
+        pattern = 0
+        for _ in range(per_byte):
+            pattern = (pattern << self.bpp) | index
+        # whole bytes in the middle are set at once, the edges per pixel
+        first = (x0 + per_byte - 1) // per_byte
+        last = (x1 + 1) // per_byte
+        if first < last:
+            full = bytes((pattern & 0xFF,)) * (last - first)
+            edges = tuple(range(x0, first * per_byte)) + tuple(range(last * per_byte, x1 + 1))
+        else:
+            full = None
+            edges = tuple(range(x0, x1 + 1))
+        for row in range(y0, y1 + 1):
+            if full is not None:
+                start = row * self.stride
+                self.buf[start + first:start + last] = full
+            for px in edges:
+                self._set(px, row, index)
+        self._mark(x0, y0, x1, y1)
+
+    def flush(self, tft, x=0, y=0):
+        """
+        Expand the dirty area to RGB565 and draw it with the surface
+        origin at x, y on the display.
+        """
+        if self.dirty is None:
+            return
+        x0, y0, x1, y1 = self.dirty
+        self.dirty = None
+
+        per_byte = self.per_byte
+        b0 = x0 // per_byte
+        b1 = x1 // per_byte
+        px0 = b0 * per_byte
+        w = min((b1 + 1) * per_byte, self.width) - px0
+        linebytes = (b1 - b0 + 1) * per_byte * 2
+        if self._band is None:
+            self._band = bytearray(self.stride * per_byte * 2 * self.rows)
+        mv = memoryview(self._band)
+        table = self._table
+        src = self.buf
+
+        row = y0
+        while row <= y1:
+            n = min(self.rows, y1 - row + 1)
+            pos = 0
+            for r in range(row, row + n):
+                start = r * self.stride
+                if self._nibbles:
+                    for b in src[start + b0:start + b1 + 1]:
+                        hi = table[b >> 4]
+                        lo = table[b & 0x0F]
+                        m = len(hi)
+                        mv[pos:pos + m] = hi
+                        mv[pos + m:pos + 2 * m] = lo
+                        pos += 2 * m
+                else:
+                    for b in src[start + b0:start + b1 + 1]:
+                        entry = table[b]
+                        mv[pos:pos + len(entry)] = entry
+                        pos += len(entry)
+            tft._blit(x + px0, y + row, w, n, mv, linebytes)
+            row += n
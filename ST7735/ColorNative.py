@@ -0,0 +1,27 @@
+# MicroPython Driver TFT viper color conversion, see Color
+import micropython
+
+
+@micropython.viper
+def rgb888_to_565(src: ptr8, dst: ptr8, count: int):
+    i = 0
+    j = 0
+    end = count * 3
+    while i < end:
+        g = src[i + 1]
+        dst[j] = (src[i] & 0xF8) | (g >> 5)
+        dst[j + 1] = ((g << 3) & 0xE0) | (src[i + 2] >> 3)
+        i += 3
+        j += 2
+
+
+@micropython.viper
+def gray_to_565(src: ptr8, dst: ptr8, count: int):
+    i = 0
+    j = 0
+    while i < count:
+        v = src[i]
+        dst[j] = (v & 0xF8) | (v >> 5)
+        dst[j + 1] = ((v << 3) & 0xE0) | (v >> 3)
+        i += 1
+        j += 2
@@ -1,6 +1,10 @@
 # MicroPython Driver TFT display HAL
+import math
 import time
 from .LowLevel import Driver
+from .FrameBuffer import FrameBuffer
+from . import Color
+from . import FontFile
 
 COLOR_BLACK   = const(0x0000)
 COLOR_BLUE    = const(0x001F)
@@ -18,20 +22,48 @@ ORIENTATION_LANDSCAPE = 1
 ORIENTATION_PORTRAIT2 = 2
 ORIENTATION_LANDSCAPE2 = 3
 
+SPAN_UNBOUNDED = const(0x7FFF)
+
+def _HalfPlaneSpan( fFactor, fLimit ):
+    """
+    Integer x range solving fFactor * x <= fLimit, empty if from > to.
+    """
+    if fFactor > 1e-9:
+        return ( -SPAN_UNBOUNDED, math.floor( fLimit / fFactor + 1e-9 ) )
+    if fFactor < -1e-9:
+        return ( math.ceil( fLimit / fFactor - 1e-9 ), SPAN_UNBOUNDED )
+    if fLimit >= -1e-9:
+        return ( -SPAN_UNBOUNDED, SPAN_UNBOUNDED )
+    return ( 1, 0 )
+
 class TFT(Driver):
 
-    def __init__( self, width, height, nSPI, dc, cs, rst, bl = None , orientation = 0 ):
+    # number of colors kept in their 2 byte form
+    COLOR_CACHE = 16
+
+    def __init__( self, width, height, nSPI, dc, cs, rst, bl = None , orientation = 0, tab = None, bus = None ):
         self.width = width
         self.height = height
+        self.framebuffer = None
+        self.glyph_cache = None
+        self._colors = {}
+
+        # drawing origin and clip rectangle (x0, y0, x1, y1) in display
+        # coordinates, see PushClip and PushViewport
+        self._ox = 0
+        self._oy = 0
+        self._clip = (0, 0, width - 1, height - 1)
+        self._clip_stack = []
 
         # Driver init
-        super().__init__( width, height, nSPI, dc, cs, rst, bl , orientation )
+        super().__init__( width, height, nSPI, dc, cs, rst, bl , orientation, None, tab, None, bus )
 
     def Clear(self, color=COLOR_WHITE):
         """
-        Clear the display filling it with color.
+        Clear the display, or the current clip, filling it with color.
         """
-        self.Rect(0, 0, self.width, self.height, color)
+        x0, y0, x1, y1 = self._clip
+        self.Rect(x0 - self._ox, y0 - self._oy, x1 - x0 + 1, y1 - y0 + 1, color)
 
     def invert(self, state=None):
         """
@@ -42,6 +74,110 @@ class TFT(Driver):
         self.write_cmd(CMD_INVON if state else CMD_INVOFF)
         self.inverted = state
 
+    def buffered(self, state=None, rows=None):
+        """
+        Get/set buffered drawing.
+
+        When enabled, primitives draw into an off-screen framebuffer of the
+        given number of display rows (the whole display by default) and
+        flush() sends the changed areas. Disabling flushes pending changes.
+        """
+        if state is None:
+            return self.framebuffer is not None
+        if state:
+            self.framebuffer = FrameBuffer(self.width, self.height, rows)
+        elif self.framebuffer is not None:
+            self.flush()
+            self.framebuffer = None
+
+    def flush(self):
+        """
+        Send the dirty areas of the framebuffer to the display.
+        """
+        if self.framebuffer is not None:
+            self.framebuffer.flush(self)
+
+    def render_bands(self, draw, background=None):
+        """
+        Render a scene band by band through a framebuffer smaller than the display.
+
+        draw is called with the TFT once per band and must redraw everything
+        visible in it, writes outside the band are dropped. With a background
+        color each band is cleared first and sent completely.
+        """
+        fb = self.framebuffer
+        if fb is None:
+            draw(self)
+            return
+        for top in range(0, self.height, fb.rows):
+            fb.move(top)
+            if background is not None:
+                fb.set_window(0, top, self.width - 1, top + fb.rows - 1)
+                fb.fill(self.width * fb.rows, self._color_bytes(background))
+            draw(self)
+            fb.flush(self)
+
+    def PushClip(self, x, y, w, h):
+        """
+        Limit drawing to a rectangle within the current clip.
+
+        The rectangle is relative to the current origin. All primitives
+        trim their output to the clip before anything is sent. PopClip
+        restores the previous clip.
+        """
+        self._clip_stack.append((self._ox, self._oy, self._clip))
+        x += self._ox
+        y += self._oy
+        clip = self._clip
+        self._clip = (max(x, clip[0]), max(y, clip[1]), min(x + w - 1, clip[2]), min(y + h - 1, clip[3]))
+
+    def PushViewport(self, x, y, w, h):
+        """
+        Like PushClip, and move the origin to the top left corner of the
+        rectangle, so drawing code can use coordinates relative to it.
+        """
+        self.PushClip(x, y, w, h)
+        self._ox += x
+        self._oy += y
+
+    def PopClip(self):
+        """
+        Restore the clip and origin saved by the last PushClip or PushViewport.
+        """
+        self._ox, self._oy, self._clip = self._clip_stack.pop()
+
+    def _visible(self, x, y, w, h):
+        """
+        Return False if the rectangle lies completely outside the clip.
+        """
+        x += self._ox
+        y += self._oy
+        clip = self._clip
+        return x <= clip[2] and y <= clip[3] and x + w > clip[0] and y + h > clip[1]
+
+    def _set_window(self, x0, y0, x1, y1):
+        if self.framebuffer is None:
+            Driver._set_window(self, x0, y0, x1, y1)
+        else:
+            self.framebuffer.set_window(x0, y0, x1, y1)
+
+    def write_pixels(self, count, color):
+        if self.framebuffer is None:
+            Driver.write_pixels(self, count, color)
+        else:
+            self.framebuffer.fill(count, color)
+
+    def _color_bytes(self, color):
+        """
+        Return the 2 byte form of a 16-bit color, reused between draws.
+        """
+        data = self._colors.get(color)
+        if data is None:
+            if len(self._colors) >= TFT.COLOR_CACHE:
+                self._colors.clear()
+            data = self._colors[color] = Color.to_bytes(color)
+        return data
+
     def rgbcolor(self, r, g, b):
         """
         Pack 24-bit RGB into 16-bit value.
@@ -52,25 +188,43 @@ class TFT(Driver):
         """
         Draw a single pixel on the display with given color.
         """
-        self._set_window(x, y, x + 1, y + 1)
-        self.write_pixels(1, bytearray([color >> 8, color]))
+        x += self._ox
+        y += self._oy
+        clip = self._clip
+        if x < clip[0] or y < clip[1] or x > clip[2] or y > clip[3]:
+            return
+        if self.framebuffer is not None:
+            self.framebuffer.set_pixel(x, y, color)
+            return
+        self._set_window(x, y, x, y)
+        self.write_pixels(1, self._color_bytes(color))
 
     def Rect(self, x, y, w, h, color):
         """
         Draw a rectangle with specified coordinates/size and fill with color.
         """
-        # check the coordinates and trim if necessary
-        if x >= self.width or y >= self.height:
+        # trim to the clip, nothing is sent if no part is left
+        x += self._ox
+        y += self._oy
+        x0, y0, x1, y1 = self._clip
+        if x + w - 1 < x1:
+            x1 = x + w - 1
+        if y + h - 1 < y1:
+            y1 = y + h - 1
+        if x > x0:
+            x0 = x
+        if y > y0:
+            y0 = y
+        if x0 > x1 or y0 > y1:
             return
-        if x + w - 1 >= self.width:
-            w = self.width - x
-        if y + h - 1 >= self.height:
-            h = self.height - y
 
-        self._set_window(x, y, x + w - 1, y + h - 1)
-        self.write_pixels((w*h), bytearray([color >> 8, color]))
+        self._set_window(x0, y0, x1, y1)
+        self.write_pixels((x1 - x0 + 1) * (y1 - y0 + 1), self._color_bytes(color))
 
     def Line(self, x0, y0, x1, y1, color):
+        if not self._visible(min(x0, x1), min(y0, y1), abs(x1 - x0) + 1, abs(y1 - y0) + 1):
+            return
+
         # line is vertical
         if x0 == x1:
             # use the smallest y
@@ -84,7 +238,8 @@ class TFT(Driver):
             self.HLine(start, end, abs(x1 - x0) + 1, color)
 
         else:
-            # Bresenham's algorithm
+            # Bresenham's algorithm, pixels on the same row/column
+            # are collected into runs and drawn as one line each
             dx = abs(x1 - x0)
             dy = abs(y1 - y0)
             inx = 1 if x1 - x0 > 0 else -1
@@ -95,94 +250,191 @@ class TFT(Driver):
                 dy <<= 1
                 e = dy - dx
                 dx <<= 1
+                run = x0
                 while x0 != x1:
-                    # draw pixels
-                    self.pixel(x0, y0, color)
                     if e >= 0:
+                        self.HLine(min(run, x0), y0, abs(x0 - run) + 1, color)
+                        run = x0 + inx
                         y0 += iny
                         e -= dx
                     e += dy
                     x0 += inx
+                if run != x1:
+                    x0 -= inx
+                    self.HLine(min(run, x0), y0, abs(x0 - run) + 1, color)
 
             # not steep line
             else:
                 dx <<= 1
                 e = dx - dy
                 dy <<= 1
+                run = y0
                 while y0 != y1:
-                    # draw pixels
-                    self.pixel(x0, y0, color)
                     if e >= 0:
+                        self.VLine(x0, min(run, y0), abs(y0 - run) + 1, color)
+                        run = y0 + iny
                         x0 += inx
                         e -= dy
                     e += dx
                     y0 += iny
+                if run != y1:
+                    y0 -= iny
+                    self.VLine(x0, min(run, y0), abs(y0 - run) + 1, color)
+
+    def Lines(self, segments, color):
+        """
+        Draw many line segments given as (x0, y0, x1, y1) tuples.
+        """
+        line = self.Line
+        for x0, y0, x1, y1 in segments:
+            line(x0, y0, x1, y1, color)
+
+    def Polyline(self, points, color):
+        """
+        Draw connected line segments through a sequence of (x, y) points.
+
+        Every segment leaves out its end point, which is the start of the
+        next one, so no pixel is sent twice. The last point is drawn last.
+        """
+        line = self.Line
+        last = None
+        for point in points:
+            if last is not None and last != point:
+                x0, y0 = last
+                x1, y1 = point
+                if x0 == x1:
+                    line(x0, y0, x1, y1 - 1 if y1 > y0 else y1 + 1, color)
+                elif y0 == y1:
+                    line(x0, y0, x1 - 1 if x1 > x0 else x1 + 1, y1, color)
+                else:
+                    line(x0, y0, x1, y1, color)
+            last = point
+        if last is not None:
+            self.pixel(last[0], last[1], color)
 
     def HLine(self, x, y, w, color):
-        if x >= self.width or y >= self.height:
+        y += self._oy
+        clip = self._clip
+        if y < clip[1] or y > clip[3]:
+            return
+        x += self._ox
+        x1 = min(x + w - 1, clip[2])
+        if x < clip[0]:
+            x = clip[0]
+        if x > x1:
             return
-        if x + w - 1 >= self.width:
-            w = self.width - x
 
-        self._set_window(x, y, x + w - 1, y)
-        self.write_pixels(x+w-1, bytearray([color >> 8, color]))
+        self._set_window(x, y, x1, y)
+        self.write_pixels(x1 - x + 1, self._color_bytes(color))
 
     def VLine(self, x, y, h, color):
-        if x >= self.width or y >= self.height:
+        x += self._ox
+        clip = self._clip
+        if x < clip[0] or x > clip[2]:
+            return
+        y += self._oy
+        y1 = min(y + h - 1, clip[3])
+        if y < clip[1]:
+            y = clip[1]
+        if y > y1:
             return
-        if y + h -1 >= self.height:
-            h = self.height - y
 
-        self._set_window(x, y, x, y + h - 1)
-        self.write_pixels(y+h-1, bytearray([color >> 8, color]))
+        self._set_window(x, y, x, y1)
+        self.write_pixels(y1 - y + 1, self._color_bytes(color))
 
 
 
     def _DrawQuarterCircle(self, x, y, radius, color, lQuarters = None, bFill = False, oFillColor = None ):
-        curX = radius - 1
-        curY = 0
-        dx = 1
-        dy = 1
-        err = dx - ( radius * 2 )
-
-        while curX >= curY:
-
-            if bFill:
-                if oFillColor is None:
-                    oFillColor = oColor
-
-                self.Line( x - curY, y - curX,  x + curY, y - curX, oFillColor )
-                self.Line( x - curX, y - curY,  x + curX, y - curY, oFillColor )
-
-                self.Line( x - curX, y + curY,   x + curX, y + curY, oFillColor )
-                self.Line( x - curY, y + curX,   x + curY, y + curX, oFillColor )
-
-            if lQuarters is None or "LR" in lQuarters :
-                self.pixel( x + curX, y + curY, color ) # LR QR
-                self.pixel( x + curY, y + curX, color ) # LR QR
-
-            if lQuarters is None or "LL" in lQuarters:
-                self.pixel( x - curY, y + curX, color ) # LL QR
-                self.pixel( x - curX, y + curY, color ) # LL QR
-
-            if lQuarters is None or "UL" in lQuarters:
-                self.pixel( x - curX, y - curY, color )  # UL QR
-                self.pixel( x - curY, y - curX, color )  # UL QR
-
-            if lQuarters is None or "UR" in lQuarters:
-                self.pixel( x + curY, y - curX, color ) # UR QR
-                self.pixel( x + curX, y - curY, color ) # QR
+        if lQuarters is None:
+            fnSpans = None
+        else:
+            lQuarters = list( lQuarters )
+            def fnSpans( nDeltaY ):
+                bLeft = ( nDeltaY <= 0 and "UL" in lQuarters ) or ( nDeltaY >= 0 and "LL" in lQuarters )
+                bRight = ( nDeltaY <= 0 and "UR" in lQuarters ) or ( nDeltaY >= 0 and "LR" in lQuarters )
+                if bLeft and bRight:
+                    return ( ( -SPAN_UNBOUNDED, SPAN_UNBOUNDED ), )
+                if bLeft:
+                    return ( ( -SPAN_UNBOUNDED, 0 ), )
+                if bRight:
+                    return ( ( 0, SPAN_UNBOUNDED ), )
+                return ()
+
+        if bFill and oFillColor is None:
+            oFillColor = color
+        self._DrawCircle( x, y, radius, color, fnSpans, oFillColor if bFill else None )
+
+    def _DrawCircle( self, x, y, radius, color, fnSpans = None, oFillColor = None ):
+        """
+        Scanline circle rasterizer.
 
+        The half width of every row is computed once, each row then becomes
+        at most one window per allowed span: a plain fill when outline and
+        fill share a color, a prepared row buffer otherwise. fnSpans maps a
+        row offset to the allowed (from, to) x offsets, None allows all.
+        """
+        nRadius = radius - 1
+        if nRadius < 0 or not self._visible( x - nRadius, y - nRadius, 2 * nRadius + 1, 2 * nRadius + 1 ):
+            return
 
-            if err <= 0:
-                curY += 1
-                err += dy
-                dy += 2
+        # half widths per row offset, midpoint rounded
+        lHalf = [0] * ( nRadius + 2 )
+        lHalf[nRadius + 1] = -1
+        nX = nRadius
+        nLimit = nRadius * nRadius + nRadius
+        for nD in range( nRadius + 1 ):
+            while nX * nX + nD * nD > nLimit:
+                nX -= 1
+            lHalf[nD] = nX
+
+        oMixed = None
+        if oFillColor is not None and oFillColor != color:
+            nLength = ( 2 * nRadius + 1 ) * 2
+            oOutlineRow = bytes( ( color >> 8, color & 0xFF ) ) * ( 2 * nRadius + 1 )
+            oFillRow = bytes( ( oFillColor >> 8, oFillColor & 0xFF ) ) * ( 2 * nRadius + 1 )
+            oMixed = memoryview( bytearray( nLength ) )
+
+        # only the rows inside the clip
+        nFirst = max( -nRadius, self._clip[1] - self._oy - y )
+        nLast = min( nRadius, self._clip[3] - self._oy - y )
+        for nDeltaY in range( nFirst, nLast + 1 ):
+            nD = abs( nDeltaY )
+            nHalf = lHalf[nD]
+            # outline covers |x| >= nInner, fill the inside
+            nInner = min( nHalf, lHalf[nD + 1] + 1 )
+            nY = y + nDeltaY
+
+            for nFrom, nTo in ( fnSpans( nDeltaY ) if fnSpans is not None else ( ( -nHalf, nHalf ), ) ):
+                nFrom = max( nFrom, -nHalf )
+                nTo = min( nTo, nHalf )
+                if nFrom > nTo:
+                    continue
 
-            if err > 0:
-                curX -= 1
-                dx += 2
-                err += dx - ( radius * 2 )
+                if oFillColor is None:
+                    # outline only, left and right part, joined if they touch
+                    nLeftEnd = nFrom - 1
+                    if nFrom <= -nInner:
+                        nLeftEnd = min( nTo, -nInner )
+                    nStart = max( nFrom, nInner, nLeftEnd + 1 )
+                    if nStart == nLeftEnd + 1 and nStart <= nTo and nLeftEnd >= nFrom:
+                        self.HLine( x + nFrom, nY, nTo - nFrom + 1, color )
+                        continue
+                    if nLeftEnd >= nFrom:
+                        self.HLine( x + nFrom, nY, nLeftEnd - nFrom + 1, color )
+                    if nStart <= nTo:
+                        self.HLine( x + nStart, nY, nTo - nStart + 1, color )
+                elif oMixed is None:
+                    self.HLine( x + nFrom, nY, nTo - nFrom + 1, color )
+                else:
+                    nWidth = nTo - nFrom + 1
+                    oMixed[0:nWidth * 2] = oFillRow[0:nWidth * 2]
+                    nLeft = min( nTo, -nInner ) - nFrom + 1
+                    if nLeft > 0:
+                        oMixed[0:nLeft * 2] = oOutlineRow[0:nLeft * 2]
+                    nRight = max( nFrom, nInner )
+                    if nRight <= nTo:
+                        oMixed[( nRight - nFrom ) * 2:nWidth * 2] = oOutlineRow[0:( nTo - nRight + 1 ) * 2]
+                    self._blit( x + nFrom, nY, nWidth, 1, oMixed, nWidth * 2 )
 
     def Circle( self, nCenterX, nCenterY, nRadius, oColor ):
         self._DrawQuarterCircle( nCenterX, nCenterY, nRadius, oColor )
@@ -193,28 +445,71 @@ class TFT(Driver):
     def CircleFilled( self,  nCenterX, nCenterY, nRadius, oColor, oFillColor = None ):
         self._DrawQuarterCircle( nCenterX, nCenterY, nRadius, oColor, None, True, oFillColor )
 
+    def Arc( self, nCenterX, nCenterY, nRadius, oColor, nStartAngle, nEndAngle, oFillColor = None ):
+        """
+        Draw the circle segment between two angles, optionally filled as a pie slice.
+
+        Angles are in degrees, counter-clockwise from 3 o'clock.
+        """
+        nSpan = ( nEndAngle - nStartAngle ) % 360
+        if nSpan == 0 and nEndAngle != nStartAngle:
+            self._DrawCircle( nCenterX, nCenterY, nRadius, oColor, None, oFillColor )
+            return
 
-    def Text(self, x, y, string, font, color, size=1):
+        fStart = math.radians( nStartAngle )
+        fEnd = math.radians( nStartAngle + nSpan )
+        fStartX = math.cos( fStart )
+        fStartY = math.sin( fStart )
+        fEndX = math.cos( fEnd )
+        fEndY = math.sin( fEnd )
+
+        def fnSpans( nDeltaY ):
+            nUp = -nDeltaY
+            # left of the start ray and right of the end ray
+            tStart = _HalfPlaneSpan( fStartY, fStartX * nUp )
+            tEnd = _HalfPlaneSpan( -fEndY, -fEndX * nUp )
+            if nSpan <= 180:
+                return ( ( max( tStart[0], tEnd[0] ), min( tStart[1], tEnd[1] ) ), )
+            if tEnd[0] < tStart[0]:
+                tStart, tEnd = tEnd, tStart
+            if tEnd[0] <= tStart[1] + 1:
+                return ( ( tStart[0], max( tStart[1], tEnd[1] ) ), )
+            return ( tStart, tEnd )
+
+        self._DrawCircle( nCenterX, nCenterY, nRadius, oColor, fnSpans, oFillColor )
+
+    def Text(self, x, y, string, font, color, size=1, background=None):
         """
         Draw text at a given position using the user font.
         Font can be scaled with the size parameter.
+
+        With a background color each character cell, including the spacing
+        column, is sent as one window. Without it only the set pixels are
+        drawn, as vertical runs.
+
+        font is a font dict like Fonts.terminalfont or an object with the
+        glyph interface of FontFile for proportional fonts.
         """
         if font is None:
             return
+        if hasattr(font, 'glyph'):
+            self._text_glyphs(x, y, string, font, color, size, background)
+            return
 
         width = size * font['width'] + 1
+        right = self._clip[2] - self._ox + 1
 
         px = x
         for c in string:
-            self.char(px, y, c, font, color, size, size)
+            self._char(px, y, c, font, color, size, size, background, width)
             px += width
 
             # wrap the text to the next line if it reaches the end
-            if px + width > self.width:
+            if px + width > right:
                 y += font['height'] * size + 1
                 px = x
 
-    def char(self, x, y, char, font, color, sizex=1, sizey=1):
+    def char(self, x, y, char, font, color, sizex=1, sizey=1, background=None):
         """
         Draw a character at a given position using the user font.
 
@@ -222,52 +517,269 @@ class TFT(Driver):
         """
         if font is None:
             return
+        if hasattr(font, 'glyph'):
+            glyph = font.glyph(char)
+            if glyph is not None:
+                self._glyph(x, y, char, glyph, font, color, sizex, sizey, background, glyph[0] * sizex)
+            return
+        self._char(x, y, char, font, color, sizex, sizey, background, sizex * font['width'])
 
+    def _text_glyphs(self, x, y, string, font, color, size, background):
+        right = self._clip[2] - self._ox + 1
+        px = x
+        for c in string:
+            glyph = font.glyph(c)
+            if glyph is None:
+                continue
+            advance = (glyph[0] + font.spacing) * size
+            # wrap the text to the next line if the character does not fit
+            if px + advance > right and px > x:
+                y += font.height * size + 1
+                px = x
+            self._glyph(px, y, c, glyph, font, color, size, size, background, advance)
+            px += advance
+
+    def _glyph(self, x, y, char, glyph, font, color, sizex, sizey, background, cellwidth):
+        """
+        Draw a (width, runs) glyph of a FontFile, see _char.
+        """
+        width, runs = glyph
+        if not self._visible(x, y, cellwidth, font.height * sizey):
+            return
+        if background is None:
+            for row, col, n, h in FontFile.rects(runs, width):
+                self.Rect(x + col * sizex, y + row * sizey, n * sizex, h * sizey, color)
+            return
+
+        height = font.height * sizey
+        cache = self.glyph_cache
+        if cache is not None:
+            key = (id(font), ord(char), color, background, sizex, sizey, cellwidth)
+            cell = cache.get(key)
+        if cache is None or cell is None:
+            rowbytes = cellwidth * 2
+            cell = bytearray(Color.to_bytes(background) * (cellwidth * height))
+            fg = memoryview(Color.to_bytes(color) * cellwidth)
+            mv = memoryview(cell)
+            for row, col, n in FontFile.spans(runs, width):
+                start = row * sizey * rowbytes + col * sizex * 2
+                n = min(n * sizex, cellwidth - col * sizex) * 2
+                for _ in range(sizey):
+                    mv[start:start + n] = fg[0:n]
+                    start += rowbytes
+            cell = memoryview(cell)
+            if cache is not None:
+                cache.put(key, cell)
+        self._blit(x, y, cellwidth, height, cell, cellwidth * 2)
+
+    def _char(self, x, y, char, font, color, sizex, sizey, background, cellwidth):
         startchar = font['start']
         endchar = font['end']
         ci = ord(char)
 
-        if startchar <= ci <= endchar:
-            width = font['width']
-            height = font['height']
-            ci = (ci - startchar) * width
-
-            ch = font['data'][ci:ci + width]
-
-            # no font scaling
-            px = x
-            if sizex <= 1 and sizey <= 1:
-                for c in ch:
-                    py = y
-                    for _ in range(height):
-                        if c & 0x01:
-                            self.pixel(px, py, color)
-                        py += 1
-                        c >>= 1
-                    px += 1
-
-            # scale to given sizes
-            else:
-                for c in ch:
-                    py = y
-                    for _ in range(height):
-                        if c & 0x01:
-                            self.Rect(px, py, sizex, sizey, color)
-                        py += sizey
-                        c >>= 1
-                    px += sizex
-        else:
+        if not startchar <= ci <= endchar:
             # character not found in this font
             return
 
+        width = font['width']
+        height = font['height']
+        if not self._visible(x, y, cellwidth, height * sizey):
+            return
+
+        if background is not None:
+            cache = self.glyph_cache
+            if cache is not None:
+                key = (id(font), ci, color, background, sizex, sizey, cellwidth)
+                cell = cache.get(key)
+            if cache is None or cell is None:
+                ci = (ci - startchar) * width
+                ch = font['data'][ci:ci + width]
+                cell = memoryview(self._render_cell(ch, height, color, background, sizex, sizey, cellwidth))
+                if cache is not None:
+                    cache.put(key, cell)
+            self._blit(x, y, cellwidth, height * sizey, cell, cellwidth * 2)
+            return
+
+        ci = (ci - startchar) * width
+        ch = font['data'][ci:ci + width]
+
+        # transparent, draw each run of set bits in a column as one rect
+        px = x
+        for c in ch:
+            py = y
+            run = 0
+            for _ in range(height):
+                if c & 0x01:
+                    run += 1
+                elif run:
+                    self.Rect(px, py - run * sizey, sizex, run * sizey, color)
+                    run = 0
+                py += sizey
+                c >>= 1
+            if run:
+                self.Rect(px, py - run * sizey, sizex, run * sizey, color)
+            px += sizex
+
+    def _render_cell(self, ch, height, color, background, sizex, sizey, cellwidth):
+        """
+        Render glyph columns into a row-major RGB565 cell buffer.
+
+        Each glyph row is built from pre-scaled foreground/background spans
+        and then copied sizey times.
+        """
+        fg = bytes((color >> 8, color & 0xFF)) * sizex
+        bg = bytes((background >> 8, background & 0xFF)) * sizex
+        span = sizex * 2
+        pad = (cellwidth - len(ch) * sizex) * 2
+        rowbytes = cellwidth * 2
+
+        cell = bytearray(rowbytes * height * sizey)
+        mv = memoryview(cell)
+        pos = 0
+        for r in range(height):
+            bit = 1 << r
+            start = pos
+            for c in ch:
+                mv[pos:pos + span] = fg if c & bit else bg
+                pos += span
+            for _ in range(0, pad, 2):
+                mv[pos:pos + 2] = bg[0:2]
+                pos += 2
+            for _ in range(sizey - 1):
+                mv[pos:pos + rowbytes] = mv[start:start + rowbytes]
+                pos += rowbytes
+        return cell
+
+    def Blit(self, x, y, w, h, buf):
+        """
+        Draw a w x h image of big endian RGB565 data.
+
+        buf can be a bytearray or memoryview, rows are sent straight from it
+        without copying. Parts outside the screen are skipped.
+        """
+        self._blit(x, y, w, h, memoryview(buf), w * 2)
+
+    def BlitFile(self, x, y, path, w=None, h=None, chunk=1024):
+        """
+        Stream an image file from flash to the display.
+
+        BMP files with 24-bit RGB or 16-bit RGB565 bitfields pixels are
+        detected by their header, anything else is read as raw big endian
+        RGB565 data of the given w x h. At most chunk bytes of rows are
+        held in RAM at a time.
+        """
+        with open(path, 'rb') as f:
+            header = f.read(66)
+            if header[0:2] != b'BM':
+                self._stream_rows(f, x, y, w, h, 0, w * 2, False, 0, chunk)
+                return
+
+            offset = int.from_bytes(header[10:14], 'little')
+            w = int.from_bytes(header[18:22], 'little')
+            h = int.from_bytes(header[22:26], 'little')
+            bpp = int.from_bytes(header[28:30], 'little')
+            compression = int.from_bytes(header[30:34], 'little')
+            if bpp not in (16, 24) or compression not in (0, 3) or (bpp == 16) != (compression == 3):
+                raise ValueError('unsupported BMP format')
+            # the red, green and blue masks follow the 40 byte info header
+            if bpp == 16 and header[54:66] != b'\x00\xf8\x00\x00\xe0\x07\x00\x00\x1f\x00\x00\x00':
+                raise ValueError('unsupported BMP format')
+
+            # negative height marks top-down row order
+            bottom_up = True
+            if h >= 0x80000000:
+                h = 0x100000000 - h
+                bottom_up = False
+            stride = (w * bpp // 8 + 3) & ~3
+            self._stream_rows(f, x, y, w, h, offset, stride, bottom_up, bpp, chunk)
+
+    def _stream_rows(self, f, x, y, w, h, offset, stride, bottom_up, bpp, chunk):
+        """
+        Read image rows from a file in chunks, convert and blit them.
+        Only the rows inside the clip are read. bpp 0 is headerless big
+        endian RGB565, 16 and 24 are BMP pixels.
+        """
+        if not self._visible(x, y, w, h):
+            return
+        rows = max(1, chunk // max(stride, w * 2))
+        raw = bytearray(rows * stride) if bpp else None
+        out = bytearray(rows * w * 2)
+        mv = memoryview(out)
+
+        row = max(0, self._clip[1] - self._oy - y)
+        end = min(h, self._clip[3] - self._oy - y + 1)
+        while row < end:
+            n = min(rows, end - row)
+            if raw is None:
+                # raw RGB565 rows in display order, read straight into place
+                f.seek(offset + row * stride)
+                f.readinto(mv[0:n * stride])
+            else:
+                first = h - row - n if bottom_up else row
+                f.seek(offset + first * stride)
+                f.readinto(memoryview(raw)[0:n * stride])
+                for i in range(n):
+                    src = (n - 1 - i if bottom_up else i) * stride
+                    dst = i * w * 2
+                    if bpp == 24:
+                        for _ in range(w):
+                            b = raw[src]
+                            g = raw[src + 1]
+                            r = raw[src + 2]
+                            out[dst] = (r & 0xF8) | (g >> 5)
+                            out[dst + 1] = ((g << 3) & 0xE0) | (b >> 3)
+                            src += 3
+                            dst += 2
+                    else:
+                        # little endian bitfields to big endian
+                        for _ in range(w):
+                            out[dst] = raw[src + 1]
+                            out[dst + 1] = raw[src]
+                            src += 2
+                            dst += 2
+            self._blit(x, y + row, w, n, mv, w * 2)
+            row += n
+
+    def _blit(self, x, y, w, h, buf, stride):
+        """
+        Clip a rectangle of RGB565 data and send it.
+
+        buf is a memoryview holding rows of stride bytes.
+        """
+        x += self._ox
+        y += self._oy
+        x0, y0, x1, y1 = self._clip
+        offset = 0
+        if x < x0:
+            offset += (x0 - x) * 2
+            w -= x0 - x
+            x = x0
+        if y < y0:
+            offset += (y0 - y) * stride
+            h -= y0 - y
+            y = y0
+        if x + w - 1 > x1:
+            w = x1 - x + 1
+        if y + h - 1 > y1:
+            h = y1 - y + 1
+        if w <= 0 or h <= 0:
+            return
+
+        if self.framebuffer is None:
+            self.write_window(x, y, x + w - 1, y + h - 1, buf, offset, stride)
+        else:
+            self.framebuffer.blit(x, y, x + w - 1, y + h - 1, buf, offset, stride)
+
     def reset(self):
         """
         Hard reset the display.
         """
-        self.dc.value(0)
+        self._set_dc(0)
         self.rst.value(1)
-        time.sleep_ms(500)
+        time.sleep_ms(1)
+        # low pulse of at least 10 us, then 120 ms until commands are accepted
         self.rst.value(0)
-        time.sleep_ms(500)
+        time.sleep_ms(1)
         self.rst.value(1)
-        time.sleep_ms(500)
+        time.sleep_ms(120)
+        self.invalidate_state()
@@ -0,0 +1,133 @@
+# MicroPython Driver TFT binary fonts read from flash
+
+MAGIC = b'FNT1'
+HEADER_SIZE = 10
+
+
+class FontFile(object):
+    """
+    Proportional bitmap font read glyph by glyph from a file.
+
+    Layout, all values little endian:
+
+        0   'FNT1'
+        4   height in pixels, u8
+        5   spacing between glyphs in pixels, u8
+        6   first character code, u16
+        8   number of characters, u16
+        10  index, one u32 per character plus an end entry: bits 0-23
+            are the bitmap offset, bits 24-31 the glyph width. A width
+            of 0 marks a missing character.
+            bitmaps
+
+    A bitmap is the width x height glyph read row by row as alternating
+    runs of clear and set pixels, starting with clear. Each run length is
+    one byte, longer runs continue after a 0 length run of the other kind.
+    Clear pixels after the last set run are not stored.
+
+    Only the header stays in RAM, each glyph costs two seeks. The last
+    CACHE glyphs are kept. Pass an instance as font to TFT.Text or
+    TFT.char, one file per native size. FontTools writes these files
+    from Fonts.terminalfont or BDF fonts.
+    """
+
+    CACHE = 16
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        header = self.file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[0:4] != MAGIC:
+            self.file.close()
+            raise ValueError('not a font file: ' + path)
+        self.height = header[4]
+        self.spacing = header[5]
+        self.first = header[6] | (header[7] << 8)
+        self.count = header[8] | (header[9] << 8)
+        self._glyphs = {}
+
+    def close(self):
+        self.file.close()
+
+    def glyph(self, char):
+        """
+        Return (width, runs) of a character, or None if it is missing.
+        """
+        code = ord(char)
+        glyph = self._glyphs.get(code)
+        if glyph is not None or code in self._glyphs:
+            return glyph
+
+        index = code - self.first
+        glyph = None
+        if 0 <= index < self.count:
+            f = self.file
+            f.seek(HEADER_SIZE + index * 4)
+            entry = f.read(8)
+            start = entry[0] | (entry[1] << 8) | (entry[2] << 16)
+            end = entry[4] | (entry[5] << 8) | (entry[6] << 16)
+            if entry[3]:
+                f.seek(start)
+                glyph = (entry[3], f.read(end - start))
+
+        if len(self._glyphs) >= FontFile.CACHE:
+            self._glyphs.clear()
+        self._glyphs[code] = glyph
+        return glyph
+
+    def advance(self, char):
+        """
+        Horizontal distance to the next character in pixels.
+        """
+        glyph = self.glyph(char)
+        return glyph[0] + self.spacing if glyph is not None else 0
+
+    def measure(self, string):
+        """
+        Width of a string in pixels, without the trailing spacing.
+        """
+        width = 0
+        for c in string:
+            width += self.advance(c)
+        return max(0, width - self.spacing)
+
+
+def spans(runs, width):
+    """
+    Yield (row, column, length) for the set pixels of a glyph bitmap, a
+    run crossing the end of a row is split.
+    """
+    pos = 0
+    set_run = False
+    for n in runs:
+        if set_run:
+            while n:
+                row, col = divmod(pos, width)
+                m = min(n, width - col)
+                yield (row, col, m)
+                pos += m
+                n -= m
+        else:
+            pos += n
+        set_run = not set_run
+
+
+def rects(runs, width):
+    """
+    Return the set pixels of a glyph bitmap as (row, column, length,
+    height) rectangles, equal spans in consecutive rows are merged.
+    """
+    done = []
+    active = {}
+    for row, col, n in spans(runs, width):
+        key = (col, n)
+        rect = active.get(key)
+        if rect is not None and rect[1] == row - 1:
+            rect[1] = row
+            continue
+        if rect is not None:
+            done.append((rect[0], col, n, rect[1] - rect[0] + 1))
+        active[key] = [row, row]
+    for key, rect in active.items():
+        done.append((rect[0], key[0], key[1], rect[1] - rect[0] + 1))
+    return done
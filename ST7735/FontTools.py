@@ -0,0 +1,147 @@
+# MicroPython Driver TFT font file converters, run on the host
+from .FontFile import MAGIC, HEADER_SIZE
+
+
+def encode(width, height, rows):
+    """
+    Encode a glyph given as rows of width bits, leftmost pixel in the
+    most significant bit, into runs.
+    """
+    runs = bytearray()
+    value = 0
+    run = 0
+    for y in range(height):
+        row = rows[y] if y < len(rows) else 0
+        for x in range(width - 1, -1, -1):
+            bit = (row >> x) & 1
+            if bit != value:
+                runs += _run(run)
+                value = bit
+                run = 0
+            run += 1
+    # a trailing clear run is implied
+    if value:
+        runs += _run(run)
+    return runs
+
+
+def _run(n):
+    out = bytearray()
+    while n > 255:
+        out.append(255)
+        out.append(0)
+        n -= 255
+    out.append(n)
+    return out
+
+
+def write(path, height, glyphs, spacing=1):
+    """
+    Write a font file.
+
+    glyphs maps character codes to (width, rows), see encode.
+    """
+    first = min(glyphs)
+    count = max(glyphs) - first + 1
+    offset = HEADER_SIZE + (count + 1) * 4
+    index = bytearray()
+    data = bytearray()
+    for code in range(first, first + count):
+        glyph = glyphs.get(code)
+        width = 0
+        if glyph is not None and glyph[0] > 0:
+            width = min(glyph[0], 255)
+            data += encode(width, height, glyph[1])
+        index += (offset | (width << 24)).to_bytes(4, 'little')
+        offset = HEADER_SIZE + (count + 1) * 4 + len(data)
+    index += offset.to_bytes(4, 'little')
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(bytes((height, spacing)))
+        f.write(first.to_bytes(2, 'little'))
+        f.write(count.to_bytes(2, 'little'))
+        f.write(index)
+        f.write(data)
+
+
+def from_terminalfont(font, scale=1, space=3):
+    """
+    Convert a column based font dict like Fonts.terminalfont into glyphs
+    for write. Blank columns around each glyph are trimmed to get
+    proportional widths, an empty glyph gets space columns. With scale
+    every pixel becomes a scale x scale block.
+
+    Returns (height, glyphs).
+    """
+    width = font['width']
+    height = font['height']
+    data = font['data']
+    glyphs = {}
+    for code in range(font['start'], font['end'] + 1):
+        i = (code - font['start']) * width
+        columns = [c for c in data[i:i + width]]
+        while columns and not columns[0]:
+            columns.pop(0)
+        while columns and not columns[-1]:
+            columns.pop()
+        if not columns:
+            columns = [0] * space
+        rows = []
+        for y in range(height):
+            row = 0
+            for c in columns:
+                bit = (c >> y) & 1
+                for _ in range(scale):
+                    row = (row << 1) | bit
+            for _ in range(scale):
+                rows.append(row)
+        glyphs[code] = (len(columns) * scale, rows)
+    return (height * scale, glyphs)
+
+
+def read_bdf(path):
+    """
+    Read the glyphs of a BDF font, one native size per file.
+
+    Returns (height, glyphs) for write, each glyph as wide as its advance.
+    """
+    glyphs = {}
+    height = 0
+    ascent = 0
+    code = None
+    bitmap = None
+    with open(path, 'r') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            key = parts[0]
+            if key == 'FONTBOUNDINGBOX':
+                height = int(parts[2])
+                ascent = height + int(parts[4])
+            elif key == 'ENCODING':
+                code = int(parts[1])
+            elif key == 'DWIDTH':
+                advance = int(parts[1])
+            elif key == 'BBX':
+                bw, bh, bx, by = [int(p) for p in parts[1:5]]
+            elif key == 'BITMAP':
+                bitmap = []
+            elif key == 'ENDCHAR':
+                if code is not None and code >= 0 and advance > 0:
+                    rows = [0] * height
+                    top = ascent - by - bh
+                    for n in range(len(bitmap)):
+                        y = top + n
+                        if not 0 <= y < height:
+                            continue
+                        bits = int(bitmap[n], 16) >> (len(bitmap[n]) * 4 - bw)
+                        shift = advance - bx - bw
+                        rows[y] = (bits << shift if shift >= 0 else bits >> -shift) & ((1 << advance) - 1)
+                    glyphs[code] = (advance, rows)
+                code = None
+                bitmap = None
+            elif bitmap is not None:
+                bitmap.append(key)
+    return (height, glyphs)
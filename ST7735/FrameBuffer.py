@@ -0,0 +1,181 @@
+# MicroPython Driver TFT off-screen framebuffer
+
+class FrameBuffer(object):
+    """
+    RGB565 buffer for a band of display rows.
+
+    Writes are addressed like the panel RAM: set a window, then write
+    pixels which advance row by row inside it. Touched areas are kept as a
+    short list of merged dirty rectangles, so a flush only sends those.
+
+    A band smaller than the display keeps the RAM use low, see
+    TFT.render_bands. A full 128x160 buffer needs 40 KB.
+    """
+
+    MAX_DIRTY = 8
+
+    def __init__(self, width, height, rows=None):
+        self.width = width
+        self.height = height
+        self.rows = min(rows or height, height)
+        self.buf = bytearray(width * self.rows * 2)
+        self.mv = memoryview(self.buf)
+        self.top = 0
+        self.dirty = []
+        self._line = bytearray(width * 2)
+        self._line_color = None
+        self.set_window(0, 0, width - 1, height - 1)
+
+    def move(self, top):
+        """
+        Move the band to start at display row top, dropping dirty areas.
+        """
+        self.top = top
+        self.dirty = []
+
+    def _prepare_line(self, color):
+        """
+        Fill the line pattern with the given 2 byte color, unless it already is.
+        """
+        value = (color[0] << 8) | color[1]
+        if value == self._line_color:
+            return
+        line = self._line
+        line[0] = color[0]
+        line[1] = color[1]
+        n = 2
+        size = len(line)
+        while n < size:
+            m = min(n, size - n)
+            line[n:n + m] = line[0:m]
+            n += m
+        self._line_color = value
+
+    def set_window(self, x0, y0, x1, y1):
+        """
+        Set the write window and mark the visible part of it dirty.
+        """
+        self._x0 = x0
+        self._y0 = y0
+        self._x1 = x1
+        self._y1 = y1
+        self._cx = x0
+        self._cy = y0
+
+        # clip to the band and the screen
+        x0 = max(x0, 0)
+        x1 = min(x1, self.width - 1)
+        y0 = max(y0, self.top)
+        y1 = min(y1, self.top + self.rows - 1, self.height - 1)
+        if x0 <= x1 and y0 <= y1:
+            self.add_dirty(x0, y0, x1, y1)
+
+    def set_pixel(self, x, y, color):
+        """
+        Set a single pixel to a 16-bit color, ignoring it outside the band.
+        """
+        if 0 <= x < self.width and self.top <= y < self.top + self.rows:
+            i = ((y - self.top) * self.width + x) * 2
+            self.buf[i] = color >> 8
+            self.buf[i + 1] = color & 0xFF
+            self.add_dirty(x, y, x, y)
+
+    def _stream(self, count, src, step):
+        """
+        Advance the window cursor over count pixels, copying them from src.
+
+        With a step of 0 src is a line pattern which is reused for each row,
+        otherwise src is raw pixel data which is consumed as it goes.
+        """
+        width = self.width
+        top = self.top
+        bottom = top + self.rows
+        pos = 0
+        while count > 0:
+            cx = self._cx
+            cy = self._cy
+            n = min(count, self._x1 - cx + 1)
+            if top <= cy < bottom:
+                a = max(cx, 0)
+                b = min(cx + n, width)
+                if a < b:
+                    i = ((cy - top) * width + a) * 2
+                    j = pos + (a - cx) * 2 * step
+                    self.mv[i:i + (b - a) * 2] = src[j:j + (b - a) * 2]
+            pos += n * 2 * step
+            count -= n
+            cx += n
+            if cx > self._x1:
+                cx = self._x0
+                cy = cy + 1 if cy < self._y1 else self._y0
+            self._cx = cx
+            self._cy = cy
+
+    def fill(self, count, color):
+        """
+        Write count pixels of a 2 byte color at the window cursor.
+        """
+        self._prepare_line(color)
+        self._stream(count, self._line, 0)
+
+    def write(self, data):
+        """
+        Write raw RGB565 pixel data at the window cursor.
+        """
+        self._stream(len(data) // 2, memoryview(data), 1)
+
+    def blit(self, x0, y0, x1, y1, buf, offset, stride):
+        """
+        Copy a rectangle of pixel data from a larger buffer into the window.
+        """
+        self.set_window(x0, y0, x1, y1)
+        length = (x1 - x0 + 1) * 2
+        for _ in range(y1 - y0 + 1):
+            self._stream(length // 2, buf[offset:offset + length], 1)
+            offset += stride
+
+    def add_dirty(self, x0, y0, x1, y1):
+        """
+        Add a dirty rectangle, merging it with the ones it touches.
+        """
+        dirty = self.dirty
+        merged = True
+        while merged:
+            merged = False
+            for r in dirty:
+                if x0 <= r[2] + 1 and r[0] <= x1 + 1 and y0 <= r[3] + 1 and r[1] <= y1 + 1:
+                    dirty.remove(r)
+                    x0 = min(x0, r[0])
+                    y0 = min(y0, r[1])
+                    x1 = max(x1, r[2])
+                    y1 = max(y1, r[3])
+                    merged = True
+                    break
+
+        if len(dirty) >= FrameBuffer.MAX_DIRTY:
+            # merge into the rectangle which grows the least
+            best = None
+            growth = 0
+            for r in dirty:
+                ux0 = min(x0, r[0])
+                uy0 = min(y0, r[1])
+                ux1 = max(x1, r[2])
+                uy1 = max(y1, r[3])
+                g = (ux1 - ux0 + 1) * (uy1 - uy0 + 1) - (r[2] - r[0] + 1) * (r[3] - r[1] + 1)
+                if best is None or g < growth:
+                    best = r
+                    growth = g
+            dirty.remove(best)
+            self.add_dirty(min(x0, best[0]), min(y0, best[1]), max(x1, best[2]), max(y1, best[3]))
+            return
+
+        dirty.append((x0, y0, x1, y1))
+
+    def flush(self, drv):
+        """
+        Send all dirty rectangles to the panel, one window write each.
+        """
+        stride = self.width * 2
+        for x0, y0, x1, y1 in self.dirty:
+            drv.write_window(x0, y0, x1, y1, self.mv, ((y0 - self.top) * self.width + x0) * 2, stride)
+        self.dirty = []
@@ -0,0 +1,74 @@
+# MicroPython Driver TFT rendered glyph cache
+
+class GlyphCache(object):
+    """
+    Cache of rendered RGB565 character cells with a byte budget.
+
+    Entries are keyed by font, character, colors, scale and cell width.
+    When the budget is exceeded the least recently used cells are evicted.
+    Use it with a TFT by setting tft.glyph_cache = GlyphCache(budget),
+    it applies to text drawn with a background color.
+    """
+
+    def __init__(self, budget=4096):
+        self.budget = budget
+        self._entries = {}
+        self._tick = 0
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Return the cached cell for key, or None.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._tick += 1
+        entry[1] = self._tick
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, cell):
+        """
+        Store a cell, evicting old entries to stay within the budget.
+
+        Cells larger than the whole budget are not cached.
+        """
+        size = len(cell)
+        if size > self.budget:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.used -= len(old[0])
+        while self.used + size > self.budget:
+            self._evict()
+        self._tick += 1
+        self._entries[key] = [cell, self._tick]
+        self.used += size
+
+    def _evict(self):
+        oldest = None
+        tick = 0
+        for key, entry in self._entries.items():
+            if oldest is None or entry[1] < tick:
+                oldest = key
+                tick = entry[1]
+        self.used -= len(self._entries.pop(oldest)[0])
+        self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all entries, the counters are kept.
+        """
+        self._entries = {}
+        self.used = 0
+
+    def stats(self):
+        """
+        Return (hits, misses, evictions, bytes used, entries).
+        """
+        return (self.hits, self.misses, self.evictions, self.used, len(self._entries))
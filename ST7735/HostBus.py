@@ -0,0 +1,258 @@
+# MicroPython Driver TFT simulated bus for running without hardware
+try:
+    import ubinascii as binascii
+except ImportError:
+    import binascii
+try:
+    import zlib
+except ImportError:
+    zlib = None
+
+
+class _HostPin(object):
+
+    def __init__(self, state=1):
+        self.state = state
+        self.writes = 0
+
+    def value(self, state=None):
+        if state is None:
+            return self.state
+        self.state = 1 if state else 0
+        self.writes += 1
+
+
+class _HostSPI(object):
+
+    def __init__(self, bus):
+        self.bus = bus
+
+    def write(self, data):
+        self.bus.transfer(data)
+
+
+class HostBus(object):
+    """
+    Simulated panel for running the driver without hardware.
+
+    The command stream is decoded like the controller does: CASET/RASET
+    set the window, RAMWR writes RGB565 pixels into ram, which advance
+    row by row inside the window. Pixels outside the panel are dropped.
+    MADCTL and the scroll start are only recorded, ram is kept in the
+    logical orientation the driver addresses.
+
+    Every SPI write is counted as one transaction to the command it
+    belongs to, see counts and totals. windows counts the RAMWR commands,
+    i.e. the window setups. Writes while CS is high are not seen by the
+    panel and only counted in ignored.
+    """
+
+    CMD_CASET  = 0x2A
+    CMD_RASET  = 0x2B
+    CMD_RAMWR  = 0x2C
+    CMD_MADCTL = 0x36
+    CMD_VSCSAD = 0x37
+
+    def __init__(self, width, height, margin_row=0, margin_col=0):
+        self.width = width
+        self.height = height
+        self.margin_row = margin_row
+        self.margin_col = margin_col
+        self.ram = bytearray(width * height * 2)
+        self.spi = _HostSPI(self)
+        self.dc  = _HostPin(0)
+        self.cs  = _HostPin(1)
+        self.rst = _HostPin(1)
+        self.madctl = 0
+        self.scroll_start = 0
+        self.cmd = None
+        self._args = bytearray()
+        self._odd = None
+        self._x0 = self._x = 0
+        self._y0 = self._y = 0
+        self._x1 = width - 1
+        self._y1 = height - 1
+        self.reset_counters()
+
+    def reset_counters(self):
+        """
+        Clear the per command counters.
+        """
+        self.counts = {}
+        self.windows = 0
+        self.ignored = 0
+
+    def totals(self):
+        """
+        Return (transactions, bytes) over all commands.
+        """
+        calls = 0
+        size = 0
+        for c, b in self.counts.values():
+            calls += c
+            size += b
+        return (calls, size)
+
+    def _count(self, cmd, size):
+        entry = self.counts.get(cmd)
+        if entry is None:
+            self.counts[cmd] = [1, size]
+        else:
+            entry[0] += 1
+            entry[1] += size
+
+    def transfer(self, data):
+        """
+        Feed one SPI write to the simulated panel.
+        """
+        if self.cs.state:
+            self.ignored += 1
+            return
+        if not self.dc.state:
+            for cmd in data:
+                self._command(cmd)
+            self._count(data[-1], len(data))
+            return
+        self._count(self.cmd, len(data))
+        if self.cmd == HostBus.CMD_RAMWR:
+            self._pixels(data)
+        elif self.cmd is not None:
+            self._args.extend(data)
+            self._apply()
+
+    def _command(self, cmd):
+        self.cmd = cmd
+        self._args = bytearray()
+        self._odd = None
+        if cmd == HostBus.CMD_RAMWR:
+            self.windows += 1
+            self._x = self._x0
+            self._y = self._y0
+
+    def _apply(self):
+        args = self._args
+        cmd = self.cmd
+        if cmd == HostBus.CMD_CASET and len(args) >= 4:
+            self._x0 = ((args[0] << 8) | args[1]) - self.margin_col
+            self._x1 = ((args[2] << 8) | args[3]) - self.margin_col
+        elif cmd == HostBus.CMD_RASET and len(args) >= 4:
+            self._y0 = ((args[0] << 8) | args[1]) - self.margin_row
+            self._y1 = ((args[2] << 8) | args[3]) - self.margin_row
+        elif cmd == HostBus.CMD_MADCTL and len(args) >= 1:
+            self.madctl = args[0]
+        elif cmd == HostBus.CMD_VSCSAD and len(args) >= 2:
+            self.scroll_start = (args[0] << 8) | args[1]
+
+    def _pixels(self, data):
+        if self._odd is not None:
+            data = bytes((self._odd,)) + bytes(data)
+            self._odd = None
+        if len(data) & 1:
+            self._odd = data[-1]
+        src = memoryview(data)
+        total = len(data) // 2
+        i = 0
+        ram = self.ram
+        while i < total:
+            if self._y > self._y1:
+                # the controller wraps to the start of the window
+                self._y = self._y0
+            n = min(self._x1 - self._x + 1, total - i)
+            y = self._y
+            if 0 <= y < self.height:
+                x0 = max(self._x, 0)
+                x1 = min(self._x + n, self.width)
+                if x0 < x1:
+                    start = (y * self.width + x0) * 2
+                    skip = (x0 - self._x + i) * 2
+                    ram[start:start + (x1 - x0) * 2] = src[skip:skip + (x1 - x0) * 2]
+            i += n
+            self._x += n
+            if self._x > self._x1:
+                self._x = self._x0
+                self._y += 1
+
+    def pixel(self, x, y):
+        """
+        Return the RGB565 value at x, y.
+        """
+        i = (y * self.width + x) * 2
+        return (self.ram[i] << 8) | self.ram[i + 1]
+
+    def rgb888(self):
+        """
+        Return the ram as packed RGB888 rows.
+        """
+        ram = self.ram
+        out = bytearray(self.width * self.height * 3)
+        j = 0
+        for i in range(0, len(ram), 2):
+            v = (ram[i] << 8) | ram[i + 1]
+            r = (v >> 11) & 0x1F
+            g = (v >> 5) & 0x3F
+            b = v & 0x1F
+            out[j] = (r << 3) | (r >> 2)
+            out[j + 1] = (g << 2) | (g >> 4)
+            out[j + 2] = (b << 3) | (b >> 2)
+            j += 3
+        return out
+
+    def save_ppm(self, path):
+        """
+        Dump the ram as binary PPM.
+        """
+        with open(path, 'wb') as f:
+            f.write(('P6\n%d %d\n255\n' % (self.width, self.height)).encode())
+            f.write(self.rgb888())
+
+    def save_png(self, path):
+        """
+        Dump the ram as 8 bit RGB PNG. Without zlib the image data is
+        stored uncompressed.
+        """
+        rgb = self.rgb888()
+        stride = self.width * 3
+        raw = bytearray()
+        for y in range(self.height):
+            raw.append(0)
+            raw.extend(rgb[y * stride:(y + 1) * stride])
+        with open(path, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+            header = self.width.to_bytes(4, 'big') + self.height.to_bytes(4, 'big') + b'\x08\x02\x00\x00\x00'
+            HostBus._chunk(f, b'IHDR', header)
+            HostBus._chunk(f, b'IDAT', HostBus._deflate(raw))
+            HostBus._chunk(f, b'IEND', b'')
+
+    @staticmethod
+    def _chunk(f, kind, data):
+        f.write(len(data).to_bytes(4, 'big'))
+        f.write(kind)
+        f.write(data)
+        crc = binascii.crc32(data, binascii.crc32(kind)) & 0xFFFFFFFF
+        f.write(crc.to_bytes(4, 'big'))
+
+    @staticmethod
+    def _deflate(data):
+        if zlib is not None and hasattr(zlib, 'compress'):
+            return zlib.compress(bytes(data))
+        # zlib stream of stored blocks
+        out = bytearray(b'\x78\x01')
+        size = len(data)
+        i = 0
+        while True:
+            n = min(size - i, 0xFFFF)
+            last = 1 if i + n >= size else 0
+            out.append(last)
+            out.extend(n.to_bytes(2, 'little'))
+            out.extend((n ^ 0xFFFF).to_bytes(2, 'little'))
+            out.extend(data[i:i + n])
+            i += n
+            if last:
+                break
+        a = 1
+        b = 0
+        for v in data:
+            a = (a + v) % 65521
+            b = (b + a) % 65521
+        out.extend(((b << 16) | a).to_bytes(4, 'big'))
+        return bytes(out)
@@ -1,6 +1,6 @@
 # MicroPython Driver TFT display driver
 import time
-from machine import SPI, Pin
+from .Bus import MachineBus
 
 class Driver(object):
 
@@ -25,6 +25,8 @@ class Driver(object):
     CMD_RAMRD   = const(0x2E) # Memory read
 
     CMD_PTLAR   = const(0x30) # Partial start/end address set
+    CMD_VSCRDEF = const(0x33) # Vertical scrolling definition
+    CMD_VSCSAD  = const(0x37) # Vertical scroll start address
     CMD_COLMOD  = const(0x3A) # Interface pixel format
     CMD_MADCTL  = const(0x36) # Memory data access control
 
@@ -55,94 +57,125 @@ class Driver(object):
     #A0 = 270 right rotation
     ORIENTATIONS = [0x00, 0x60, 0xC0, 0xA0]
 
-
-    def __init__(self, width, height, spi, dc, cs, rst, bl = None , orientation = 0 ):
+    # rows of the controller frame memory
+    FRAME_ROWS = const(162)
+
+    # init table: command, argument count (| INIT_DELAY), arguments, [delay ms]
+    # delays are the datasheet minimums, the hard reset before the table
+    # already waits out the 120 ms reset time so no SWRESET is needed
+    INIT_DELAY = const(0x80)
+    INIT_TABLE = bytes((
+        CMD_SLPOUT,  INIT_DELAY, 120,
+        CMD_FRMCTR1, 3, 0x01, 0x2C, 0x2D,
+        CMD_FRMCTR2, 6, 0x01, 0x2C, 0x2D, 0x01, 0x2C, 0x2D,
+        CMD_INVCTR,  1, 0x07,
+        CMD_PWCTR1,  3, 0xA2, 0x02, 0x84,
+        CMD_PWCTR2,  1, 0xC5,
+        CMD_PWCTR3,  2, 0x8A, 0x00,
+        CMD_PWCTR4,  2, 0x8A, 0x2A,
+        CMD_PWCTR5,  2, 0x8A, 0xEE,
+        CMD_VMCTR1,  1, 0x0E,
+        CMD_INVOFF,  0,
+        CMD_MADCTL,  1, 0x00,
+        CMD_COLMOD,  1, 0x05,
+        CMD_GMCTRP1, 16, 0x02, 0x1C, 0x07, 0x12, 0x37, 0x32, 0x29, 0x2D,
+                         0x29, 0x25, 0x2B, 0x39, 0x00, 0x01, 0x03, 0x10,
+        CMD_GMCTRN1, 16, 0x03, 0x1D, 0x07, 0x06, 0x2E, 0x2C, 0x29, 0x2D,
+                         0x2E, 0x2E, 0x37, 0x3F, 0x00, 0x00, 0x02, 0x10,
+        CMD_NORON,   0,
+        CMD_DISPON,  0,
+    ))
+
+    # panel variants by tab color: init table, row margin, column margin, MADCTL color order
+    TABS = {
+        'red':   (INIT_TABLE, 0, 0, 0x00),
+        'green': (INIT_TABLE, 1, 2, 0x00),
+        'black': (INIT_TABLE, 0, 0, 0x08),
+    }
+
+
+    def __init__(self, width, height, spi, dc, cs, rst, bl = None , orientation = 0, fill_chunk = None, tab = None, init_table = None, bus = None ):
 
         """
-        SPI      - SPI Bus (CLK/MOSI/MISO)
-        DC       - RS/DC data/command flag
-        CS       - Chip Select, enable communication
-        RST/RES  - Reset
-        BL/Lite  - Backlight control
+        SPI        - SPI Bus (CLK/MOSI/MISO)
+        DC         - RS/DC data/command flag
+        CS         - Chip Select, enable communication
+        RST/RES    - Reset
+        BL/Lite    - Backlight control
+        fill_chunk - pixels per SPI write for bulk fills, defaults to one line
+        tab        - panel variant from TABS, sets init table, margins and color order
+        init_table - init table overriding the one of the tab
+        bus        - object with spi, dc, cs and rst, e.g. a HostBus, instead
+                     of the board pins
         """
 
-        # self.tab        = tab
         self.power_on     = True
         self.inverted     = False
         self.backlight_on = True
         self.orientation = Driver.ORIENTATIONS[ orientation ]
 
-        # self.tab = tab
-        self.spi = SPI(1, baudrate=8000000, polarity=1, phase=0)
-        self.dc  = Pin(dc, Pin.OUT)
-        self.cs  = Pin(cs, Pin.OUT)
-        self.rst = Pin(rst, Pin.OUT)
+        self.tab = tab
+        self.madctl = 0x00
+        if bus is None:
+            bus = MachineBus(1, dc, cs, rst)
+        self.bus = bus
+        self.spi = bus.spi
+        self.dc  = bus.dc
+        self.cs  = bus.cs
+        self.rst = bus.rst
         self.bl  = bl
 
         # default margins, set yours in HAL init
         self.margin_row = 0
         self.margin_col = 0
+        self.scroll_top = 0
+        if tab is not None:
+            table, self.margin_row, self.margin_col, self.madctl = Driver.TABS[tab]
+            init_table = init_table or table
+
+        # reusable line buffer for bulk fills
+        self.set_fill_chunk(fill_chunk or width)
+
+        # bus state cache, lets redundant commands and pin writes be skipped
+        self.hold_cs = False
+        self._cmd_buf = bytearray(1)
+        self._win_buf = bytearray(4)
+        self._dc_state = None
+        self._cs_state = None
+        self._window_rows = None
+        self._window_cols = None
+        self.reset_stats()
 
         # hard reset first
         self.reset()
+        self.init_panel(init_table or Driver.INIT_TABLE)
 
-        self.write_cmd(Driver.CMD_SWRESET)
-        time.sleep_ms(150)
-        self.write_cmd(Driver.CMD_SLPOUT)
-        time.sleep_ms(255)
-
-        # TODO: optimize data streams and delays
-        self.write_cmd(Driver.CMD_FRMCTR1)
-        self.write_data(bytearray([0x01, 0x2C, 0x2D]))
-        self.write_cmd(Driver.CMD_FRMCTR2)
-        self.write_data(bytearray([0x01, 0x2C, 0x2D, 0x01, 0x2C, 0x2D]))
-        time.sleep_ms(10)
-
-        self.write_cmd(Driver.CMD_INVCTR)
-        self.write_data(bytearray([0x07]))
-
-        self.write_cmd(Driver.CMD_PWCTR1)
-        self.write_data(bytearray([0xA2, 0x02, 0x84]))
-        self.write_cmd(Driver.CMD_PWCTR2)
-        self.write_data(bytearray([0xC5]))
-        self.write_cmd(Driver.CMD_PWCTR3)
-        self.write_data(bytearray([0x8A, 0x00]))
-        self.write_cmd(Driver.CMD_PWCTR4)
-        self.write_data(bytearray([0x8A, 0x2A]))
-        self.write_cmd(Driver.CMD_PWCTR5)
-        self.write_data(bytearray([0x8A, 0xEE]))
-
-        self.write_cmd(Driver.CMD_VMCTR1)
-        self.write_data(bytearray([0x0E]))
-
-        self.write_cmd(Driver.CMD_INVOFF)
-        self.write_cmd(Driver.CMD_MADCTL)
-        # self._writedata(tft._TFTRotations[self.rotate] | rgb)
-        self.write_data( bytearray( [self.orientation] ) ) # RGB
-
-        self.write_cmd(Driver.CMD_COLMOD)
-        self.write_data(bytearray([0x05]))
-
-        self.write_cmd(Driver.CMD_CASET)
-        self.write_data(bytearray([0x00, 0x01, 0x00, 127]))
 
-        self.write_cmd(Driver.CMD_RASET)
-        self.write_data(bytearray([0x00, 0x01, 0x00, 119]))
-
-        self.write_cmd(Driver.CMD_GMCTRP1)
-        self.write_data(bytearray([0x02, 0x1c, 0x07, 0x12, 0x37, 0x32,
-            0x29, 0x2d, 0x29, 0x25, 0x2b, 0x39, 0x00, 0x01, 0x03, 0x10]))
-
-        self.write_cmd(Driver.CMD_GMCTRN1)
-        self.write_data(bytearray([0x03, 0x1d, 0x07, 0x06, 0x2e, 0x2c,
-            0x29, 0x2d, 0x2e, 0x2e, 0x37, 0x3f, 0x00, 0x00, 0x02, 0x10]))
-
-        self.write_cmd(Driver.CMD_NORON)
-        time.sleep_ms(10)
-
-        self.write_cmd(Driver.CMD_DISPON)
-        time.sleep_ms(100)
+    def init_panel(self, table):
+        """
+        Run a panel init table.
 
+        Each step is a command byte, an argument count which has INIT_DELAY
+        set if a delay byte follows, the arguments and the delay in ms. The
+        MADCTL argument is replaced by the orientation and tab color order.
+        """
+        steps = memoryview(table)
+        i = 0
+        size = len(table)
+        while i < size:
+            cmd = steps[i]
+            count = steps[i + 1]
+            i += 2
+            self.write_cmd(cmd)
+            n = count & ~Driver.INIT_DELAY
+            if cmd == CMD_MADCTL:
+                self.write_data(bytearray([self.orientation | self.madctl]))
+            elif n:
+                self.write_data(steps[i:i + n])
+            i += n
+            if count & Driver.INIT_DELAY:
+                time.sleep_ms(steps[i])
+                i += 1
 
     def power(self, state=None):
         """
@@ -165,54 +198,223 @@ class Driver(object):
             self.bl.value(1 if state else 0)
             self.backlight_on = state
 
+    def scroll_area(self, top, height, bottom=None):
+        """
+        Define the vertical scrolling area.
+
+        top/bottom are fixed rows above and below the scrolling area of
+        height rows. By default bottom covers the rest of the frame memory.
+        Scrolling moves along the panel rows, so it is vertical only in
+        portrait orientations.
+        """
+        top += self.margin_row
+        if bottom is None:
+            bottom = max(0, Driver.FRAME_ROWS - top - height)
+        self.write_cmd(CMD_VSCRDEF)
+        self.write_data(bytearray([top >> 8, top, height >> 8, height, bottom >> 8, bottom]))
+        self.scroll_top = top
+
+    def scroll(self, line):
+        """
+        Show the scrolling area starting at the given line of it.
+        """
+        line += self.scroll_top
+        self.write_cmd(CMD_VSCSAD)
+        self.write_data(bytearray([line >> 8, line]))
+
+    def partial(self, start=None, end=None):
+        """
+        Enter partial mode showing only rows start to end, or return to
+        normal mode when called without rows.
+        """
+        if start is None:
+            self.write_cmd(CMD_NORON)
+            return
+        start += self.margin_row
+        end += self.margin_row
+        self.write_cmd(CMD_PTLAR)
+        self.write_data(bytearray([start >> 8, start, end >> 8, end]))
+        self.write_cmd(CMD_PTLON)
+
+    def set_fill_chunk(self, pixels):
+        """
+        Set the size of the bulk fill buffer in pixels.
+
+        Larger chunks need fewer SPI writes, smaller ones less RAM.
+        """
+        self.fill_chunk = max(1, pixels)
+        self._fill_buf = bytearray(self.fill_chunk * 2)
+        self._fill_mv = memoryview(self._fill_buf)
+        self._fill_color = None
+
+    def _prepare_fill(self, color):
+        """
+        Fill the line buffer with the given 2 byte color, unless it already is.
+        """
+        value = (color[0] << 8) | color[1]
+        if value == self._fill_color:
+            return
+        buf = self._fill_buf
+        buf[0] = color[0]
+        buf[1] = color[1]
+        # double the filled part until the whole buffer is covered
+        n = 2
+        size = len(buf)
+        while n < size:
+            m = min(n, size - n)
+            buf[n:n + m] = buf[0:m]
+            n += m
+        self._fill_color = value
+
     def write_pixels(self, count, color):
         """
         Write pixels to the display.
 
         count - total number of pixels
-        color - 16-bit RGB value
+        color - 16-bit RGB value as 2 bytes
         """
-        self.dc.value(1)
-        self.cs.value(0)
-        for _ in range(count):
-            self.spi.write(color)
-        self.cs.value(1)
+        self._prepare_fill(color)
+        chunk = self.fill_chunk
+        self._set_dc(1)
+        self._select()
+        for _ in range(count // chunk):
+            self.spi.write(self._fill_buf)
+        rest = count % chunk
+        if rest:
+            self.spi.write(self._fill_mv[:rest * 2])
+        self._deselect()
+
+    def write_rows(self, buf, offset, stride, length, rows):
+        """
+        Write rows of pixel data from a larger buffer in one transfer.
+
+        buf    - memoryview of RGB565 data
+        offset - byte offset of the first row
+        stride - bytes between the starts of two rows
+        length - bytes per row
+        rows   - number of rows
+        """
+        self._set_dc(1)
+        self._select()
+        if stride == length:
+            self.spi.write(buf[offset:offset + length * rows])
+        else:
+            for _ in range(rows):
+                self.spi.write(buf[offset:offset + length])
+                offset += stride
+        self._deselect()
+
+    def write_window(self, x0, y0, x1, y1, buf, offset, stride):
+        """
+        Write a rectangle of pixel data from a larger buffer to the panel.
+        """
+        Driver._set_window(self, x0, y0, x1, y1)
+        self.write_rows(buf, offset, stride, (x1 - x0 + 1) * 2, y1 - y0 + 1)
 
     def write_cmd(self, cmd):
         """
         Display command write implementation using SPI.
         """
-        self.dc.value(0)
-        self.cs.value(0)
-        self.spi.write(bytearray([cmd]))
-        self.cs.value(1)
+        if cmd == CMD_RASET or cmd == CMD_SWRESET:
+            self._window_rows = None
+        if cmd == CMD_CASET or cmd == CMD_SWRESET:
+            self._window_cols = None
+        self._set_dc(0)
+        self._select()
+        self._cmd_buf[0] = cmd
+        self.spi.write(self._cmd_buf)
+        self._deselect()
 
     def write_data(self, data):
         """
         Display data write implementation using SPI.
         """
-        self.dc.value(1)
-        self.cs.value(0)
+        self._set_dc(1)
+        self._select()
         self.spi.write(data)
+        self._deselect()
+
+    def _set_dc(self, state):
+        """
+        Set the DC pin unless it is already in that state.
+        """
+        if state == self._dc_state:
+            self.saved_pin_writes += 1
+            return
+        self.dc.value(state)
+        self._dc_state = state
+
+    def _select(self):
+        if self._cs_state == 0:
+            self.saved_pin_writes += 1
+            return
+        self.cs.value(0)
+        self._cs_state = 0
+
+    def _deselect(self):
+        if self.hold_cs:
+            return
         self.cs.value(1)
+        self._cs_state = 1
+
+    def invalidate_state(self):
+        """
+        Forget the cached pin and window state, e.g. after a hard reset or
+        when another driver has used the pins.
+        """
+        self._dc_state = None
+        self._cs_state = None
+        self._window_rows = None
+        self._window_cols = None
+
+    def reset_stats(self):
+        """
+        Reset the counters of skipped commands and pin writes.
+        """
+        self.saved_commands = 0
+        self.saved_pin_writes = 0
+
+    def stats(self):
+        """
+        Return (saved commands, saved pin writes). A skipped address set
+        counts as two commands, the command and its data.
+        """
+        return (self.saved_commands, self.saved_pin_writes)
 
     def _set_window(self, x0, y0, x1, y1):
         """
         Set window frame boundaries.
 
-        Any pixels written to the display will start from this area.
+        Any pixels written to the display will start from this area. Row
+        and column ranges which are already programmed are not sent again.
         """
+        buf = self._win_buf
+
         # set row XSTART/XEND
-        self.write_cmd(CMD_RASET)
-        self.write_data(bytearray(
-            [0x00, y0 + self.margin_row, 0x00, y1 + self.margin_row])
-        )
+        rows = (y0 + self.margin_row, y1 + self.margin_row)
+        if rows != self._window_rows:
+            self.write_cmd(CMD_RASET)
+            buf[0] = rows[0] >> 8
+            buf[1] = rows[0] & 0xFF
+            buf[2] = rows[1] >> 8
+            buf[3] = rows[1] & 0xFF
+            self.write_data(buf)
+            self._window_rows = rows
+        else:
+            self.saved_commands += 2
 
         # set column XSTART/XEND
-        self.write_cmd(CMD_CASET)
-        self.write_data(bytearray(
-            [0x00, x0 + self.margin_col, 0x00, x1 + self.margin_col])
-        )
+        cols = (x0 + self.margin_col, x1 + self.margin_col)
+        if cols != self._window_cols:
+            self.write_cmd(CMD_CASET)
+            buf[0] = cols[0] >> 8
+            buf[1] = cols[0] & 0xFF
+            buf[2] = cols[1] >> 8
+            buf[3] = cols[1] & 0xFF
+            self.write_data(buf)
+            self._window_cols = cols
+        else:
+            self.saved_commands += 2
 
         # write addresses to RAM
         self.write_cmd(CMD_RAMWR)
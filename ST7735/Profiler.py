@@ -0,0 +1,116 @@
+# MicroPython Driver TFT profiler
+import time
+from .Bus import CountingSPI
+
+
+class Profiler(object):
+    """
+    Opt-in call counter and timer for a TFT.
+
+    attach() shadows the listed methods with timing wrappers on the
+    instance and routes the SPI writes through a byte counter. detach()
+    removes them again, so a TFT which is not profiled runs the plain
+    class methods without any extra cost.
+
+    Time (ticks_us) and bytes are inclusive: a Text call also accounts
+    for the Rect and driver calls it makes, so the public primitives show
+    what the application code costs and the driver entries show where it
+    goes. Calls made while the same method is already running, e.g.
+    Driver._set_window from an overridden _set_window, are only counted.
+    """
+
+    DRIVER = ('_set_window', 'write_cmd', 'write_data', 'write_pixels',
+              'write_rows', 'write_window')
+    PRIMITIVES = ('Clear', 'pixel', 'Rect', 'HLine', 'VLine', 'Line', 'Lines',
+                  'Polyline', 'Circle', 'CircleFilled', 'DrawCircleSegment',
+                  'Arc', 'Text', 'char', 'Blit', 'BlitFile', 'flush',
+                  '_DrawQuarterCircle', '_DrawCircle', '_char')
+
+    def __init__(self, tft, names=None):
+        self.tft = tft
+        self.names = names or (Profiler.PRIMITIVES + Profiler.DRIVER)
+        self.attached = False
+        # name -> [calls, us, bytes, running]
+        self.entries = {}
+        for name in self.names:
+            self.entries[name] = [0, 0, 0, 0]
+        self.counter = CountingSPI()
+
+    def reset(self):
+        """
+        Clear the collected numbers.
+        """
+        for entry in self.entries.values():
+            entry[0] = entry[1] = entry[2] = 0
+
+    def attach(self):
+        if self.attached:
+            return
+        tft = self.tft
+        for name in self.names:
+            if hasattr(tft, name):
+                setattr(tft, name, self._wrap(name, getattr(tft, name)))
+        self.counter.spi = tft.spi
+        tft.spi = self.counter
+        self.attached = True
+
+    def detach(self):
+        if not self.attached:
+            return
+        tft = self.tft
+        for name in self.names:
+            if name in tft.__dict__:
+                delattr(tft, name)
+        tft.spi = self.counter.spi
+        self.attached = False
+
+    def _wrap(self, name, method):
+        entry = self.entries[name]
+        counter = self.counter
+
+        def wrapper(*args, **kwargs):
+            entry[0] += 1
+            if entry[3]:
+                return method(*args, **kwargs)
+            entry[3] = 1
+            size = counter.bytes
+            start = time.ticks_us()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                entry[1] += time.ticks_diff(time.ticks_us(), start)
+                entry[2] += counter.bytes - size
+                entry[3] = 0
+        return wrapper
+
+    def summary(self, compact=False):
+        """
+        Return one line per called method, slowest first. The compact
+        lines fit the 21 columns of the status logger.
+        """
+        rows = [(entry[1], name, entry[0], entry[2])
+                for name, entry in self.entries.items() if entry[0]]
+        rows.sort(reverse=True)
+        if compact:
+            return ['%-9s%5d%5dms' % (name.lstrip('_')[:9], calls, us // 1000)
+                    for us, name, calls, size in rows]
+        return ['%-18s %6d %8dus %7dB' % (name, calls, us, size)
+                for us, name, calls, size in rows]
+
+    def dump(self, logger=None):
+        """
+        Print the summary, or write it to a TFTStatusLogger.
+        """
+        if logger is None:
+            print('%-18s %6s %10s %8s' % ('name', 'calls', 'time', 'bytes'))
+            for line in self.summary():
+                print(line)
+            return
+        lines = self.summary(True)
+        # leave the logger output out of the numbers
+        attached = self.attached
+        self.detach()
+        for line in lines:
+            logger.LogLine(line)
+        if attached:
+            self.attach()
@@ -0,0 +1,330 @@
+# MicroPython Driver TFT pixel regression checks on a simulated panel
+from . import Display
+from . import Fonts
+from .Benchmark import host_tft
+
+SIZE = 40
+
+
+def _cases(count, seed=1):
+    """
+    Yield count tuples of 4 pseudo random coordinates in -10..49, the same
+    on every port.
+    """
+    state = seed
+    for _ in range(count):
+        values = []
+        for _ in range(4):
+            state = (state * 1103515245 + 12345) & 0x7FFFFFFF
+            values.append((state >> 16) % 60 - 10)
+        yield values
+
+
+def _line_pixels(tft, x0, y0, x1, y1, color):
+    """
+    Reference line drawn pixel by pixel with the plain Bresenham loop the
+    run based Line replaced. Diagonal lines leave out the end point.
+    """
+    if x0 == x1:
+        for y in range(min(y0, y1), max(y0, y1) + 1):
+            tft.pixel(x0, y, color)
+        return
+    if y0 == y1:
+        for x in range(min(x0, x1), max(x0, x1) + 1):
+            tft.pixel(x, y0, color)
+        return
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    inx = 1 if x1 > x0 else -1
+    iny = 1 if y1 > y0 else -1
+    if dx >= dy:
+        e = 2 * dy - dx
+        while x0 != x1:
+            tft.pixel(x0, y0, color)
+            if e >= 0:
+                y0 += iny
+                e -= 2 * dx
+            e += 2 * dy
+            x0 += inx
+    else:
+        e = 2 * dx - dy
+        while y0 != y1:
+            tft.pixel(x0, y0, color)
+            if e >= 0:
+                x0 += inx
+                e -= 2 * dy
+            e += 2 * dx
+            y0 += iny
+
+
+def _diff(bus, expected):
+    """
+    Return the first (x, y, got, expected) where the panel ram differs
+    from expected, None if it matches.
+    """
+    ram = bus.ram
+    for i in range(0, len(ram), 2):
+        if ram[i] != expected[i] or ram[i + 1] != expected[i + 1]:
+            x, y = (i // 2) % bus.width, (i // 2) // bus.width
+            return (x, y, bus.pixel(x, y), (expected[i] << 8) | expected[i + 1])
+    return None
+
+
+def check_rect(count=50):
+    """
+    Rect against the pixels expected from its bounds, partly off-screen
+    rectangles included.
+    """
+    tft = host_tft(SIZE, SIZE)
+    for x, y, w, h in _cases(count):
+        w %= 30
+        h %= 30
+        tft.Clear(Display.COLOR_BLACK)
+        tft.Rect(x, y, w, h, Display.COLOR_RED)
+        expected = bytearray(len(tft.bus.ram))
+        for py in range(max(y, 0), min(y + h, tft.height)):
+            for px in range(max(x, 0), min(x + w, tft.width)):
+                i = (py * tft.width + px) * 2
+                expected[i] = Display.COLOR_RED >> 8
+                expected[i + 1] = Display.COLOR_RED & 0xFF
+        diff = _diff(tft.bus, expected)
+        if diff is not None:
+            return 'Rect(%d, %d, %d, %d)' % (x, y, w, h), diff
+    return None
+
+
+def check_line(count=200):
+    """
+    Line against the per pixel reference.
+    """
+    tft = host_tft(SIZE, SIZE)
+    ref = host_tft(SIZE, SIZE)
+    for x0, y0, x1, y1 in _cases(count, 2):
+        tft.Clear(Display.COLOR_BLACK)
+        ref.Clear(Display.COLOR_BLACK)
+        tft.Line(x0, y0, x1, y1, Display.COLOR_GREEN)
+        _line_pixels(ref, x0, y0, x1, y1, Display.COLOR_GREEN)
+        diff = _diff(tft.bus, ref.bus.ram)
+        if diff is not None:
+            return 'Line(%d, %d, %d, %d)' % (x0, y0, x1, y1), diff
+    return None
+
+
+def _scene(tft, x, y, a, b):
+    tft.Rect(x, y, a % 25, b % 25, Display.COLOR_RED)
+    tft.Line(x, y, a, b, Display.COLOR_GREEN)
+    tft.Circle(a, b, x % 15 + 1, Display.COLOR_BLUE)
+    tft.CircleFilled(b, a, y % 12 + 1, Display.COLOR_WHITE, Display.COLOR_YELLOW)
+
+
+def check_clip(count=40):
+    """
+    Drawing inside a clip against the same drawing unclipped, with
+    everything outside the clip left untouched.
+    """
+    tft = host_tft(SIZE, SIZE)
+    ref = host_tft(SIZE, SIZE)
+    for x, y, a, b in _cases(count, 3):
+        cx, cy, cw, ch = x % 20, y % 20, a % 25 + 1, b % 25 + 1
+        tft.Clear(Display.COLOR_BLACK)
+        ref.Clear(Display.COLOR_BLACK)
+        tft.PushClip(cx, cy, cw, ch)
+        _scene(tft, x, y, a, b)
+        tft.PopClip()
+        _scene(ref, x, y, a, b)
+        expected = bytearray(len(ref.bus.ram))
+        for py in range(cy, min(cy + ch, ref.height)):
+            for px in range(cx, min(cx + cw, ref.width)):
+                i = (py * ref.width + px) * 2
+                expected[i:i + 2] = ref.bus.ram[i:i + 2]
+        diff = _diff(tft.bus, expected)
+        if diff is not None:
+            return 'clip (%d, %d, %d, %d)' % (cx, cy, cw, ch), diff
+    return None
+
+
+def check_buffered(count=20):
+    """
+    Drawing into the framebuffer and flushing against drawing directly.
+    """
+    tft = host_tft(SIZE, SIZE)
+    ref = host_tft(SIZE, SIZE)
+    tft.buffered(True)
+    for x, y, a, b in _cases(count, 4):
+        tft.Clear(Display.COLOR_BLACK)
+        ref.Clear(Display.COLOR_BLACK)
+        _scene(tft, x, y, a, b)
+        tft.flush()
+        _scene(ref, x, y, a, b)
+        diff = _diff(tft.bus, ref.bus.ram)
+        if diff is not None:
+            return 'buffered (%d, %d, %d, %d)' % (x, y, a, b), diff
+    return None
+
+
+def _expect(width, height, pixels):
+    """
+    Return panel ram with the given {(x, y): color} pixels on black,
+    pixels outside the panel are left out.
+    """
+    expected = bytearray(width * height * 2)
+    for (x, y), color in pixels.items():
+        if 0 <= x < width and 0 <= y < height:
+            i = (y * width + x) * 2
+            expected[i] = color >> 8
+            expected[i + 1] = color & 0xFF
+    return expected
+
+
+def _text_pixels(x, y, string, font, color, size, background):
+    """
+    Reference text from the font bits: columns of bytes, the lowest bit
+    at the top, each character cell followed by one spacing column.
+    """
+    pixels = {}
+    width = font['width']
+    cell = size * width + 1
+    for n in range(len(string)):
+        left = x + n * cell
+        start = (ord(string[n]) - font['start']) * width
+        for col in range(cell):
+            bits = font['data'][start + col // size] if col < size * width else 0
+            for row in range(font['height'] * size):
+                if (bits >> (row // size)) & 1:
+                    pixels[(left + col, y + row)] = color
+                elif background is not None:
+                    pixels[(left + col, y + row)] = background
+    return pixels
+
+
+def check_text(strings=('Ab1 %q', '{~}|@', '09:5X')):
+    """
+    Text against the font bits, opaque and transparent at size 1 to 3.
+    """
+    tft = host_tft(128, SIZE)
+    font = Fonts.terminalfont
+    for string in strings:
+        for size in (1, 2, 3):
+            for background in (None, Display.COLOR_BLUE):
+                tft.Clear(Display.COLOR_BLACK)
+                tft.Text(3, 5, string, font, Display.COLOR_YELLOW, size, background)
+                expected = _expect(tft.width, tft.height,
+                                   _text_pixels(3, 5, string, font, Display.COLOR_YELLOW, size, background))
+                diff = _diff(tft.bus, expected)
+                if diff is not None:
+                    return 'Text(%r, size %d, %s)' % (string, size, 'opaque' if background is not None else 'transparent'), diff
+    return None
+
+
+def _circle_pixels(cx, cy, radius, color, fill):
+    """
+    Reference circle by distance: a pixel is inside if it is less than
+    radius - 1/2 from the center, on the outline if a neighbour further
+    out along x or y is not. fill None draws only the outline.
+    """
+    pixels = {}
+    r = radius - 1
+    limit = r * r + r
+    for dy in range(-r, r + 1):
+        for dx in range(-r, r + 1):
+            if dx * dx + dy * dy > limit:
+                continue
+            outer = (abs(dx) + 1) ** 2 + dy * dy > limit or dx * dx + (abs(dy) + 1) ** 2 > limit
+            if outer:
+                pixels[(cx + dx, cy + dy)] = color
+            elif fill is not None:
+                pixels[(cx + dx, cy + dy)] = fill
+    return pixels
+
+
+def check_circle(count=40):
+    """
+    Circle and CircleFilled against the distance based reference.
+    """
+    tft = host_tft(SIZE, SIZE)
+    for x, y, a, b in _cases(count, 5):
+        radius = a % 22 + 1
+        for fill in (None, Display.COLOR_YELLOW, Display.COLOR_BLUE):
+            tft.Clear(Display.COLOR_BLACK)
+            if fill is None:
+                tft.Circle(x, y, radius, Display.COLOR_BLUE)
+            else:
+                tft.CircleFilled(x, y, radius, Display.COLOR_BLUE, fill)
+            expected = _expect(SIZE, SIZE, _circle_pixels(x, y, radius, Display.COLOR_BLUE, fill))
+            diff = _diff(tft.bus, expected)
+            if diff is not None:
+                return 'Circle(%d, %d, %d, fill %s)' % (x, y, radius, fill), diff
+    return None
+
+
+def _thermometer(tft, temperature):
+    from ESP8266Libraries.Widgets.Gauges import Thermometer
+    tft.Clear(Display.COLOR_WHITE)
+    thermometer = Thermometer(tft)
+    thermometer.init()
+    thermometer.SetTemperature(temperature)
+    return thermometer
+
+
+def check_thermometer_init(temperatures=(22, 19)):
+    """
+    Thermometer init and SetTemperature after earlier readings against a
+    fresh one, init has to bring back a full repaint.
+    """
+    tft = host_tft()
+    ref = host_tft()
+    thermometer = _thermometer(tft, 22)
+    for temperature in temperatures:
+        tft.Clear(Display.COLOR_WHITE)
+        thermometer.init()
+        thermometer.SetTemperature(temperature)
+        _thermometer(ref, temperature)
+        diff = _diff(tft.bus, ref.bus.ram)
+        if diff is not None:
+            return 're-init at %s' % temperature, diff
+    return None
+
+
+def check_thermometer(temperatures=(20, 21.5, 18, 25, 30, 10, 22.3, 22.3, 19, 19.25)):
+    """
+    Thermometer updated step by step, which only repaints what changed,
+    against one set straight to the last reading.
+    """
+    tft = host_tft()
+    ref = host_tft()
+    thermometer = _thermometer(tft, temperatures[0])
+    for n in range(1, len(temperatures)):
+        thermometer.SetTemperature(temperatures[n])
+        _thermometer(ref, temperatures[n])
+        diff = _diff(tft.bus, ref.bus.ram)
+        if diff is not None:
+            return 'update to %s' % temperatures[n], diff
+    return None
+
+
+CHECKS = (
+    ('rect',        check_rect),
+    ('line',        check_line),
+    ('clip',        check_clip),
+    ('buffered',    check_buffered),
+    ('text',        check_text),
+    ('circle',      check_circle),
+    ('thermometer', check_thermometer),
+    ('thermo_init', check_thermometer_init),
+)
+
+
+def run(checks=CHECKS):
+    """
+    Run the checks, print one line each and raise AssertionError if any
+    of them found a pixel mismatch, e.g. from CI on the unix port.
+    """
+    failures = []
+    for name, check in checks:
+        failure = check()
+        print('%-12s %s' % (name, 'ok' if failure is None else
+                             '%s: pixel (%d, %d) is %04x, expected %04x' % ((failure[0],) + failure[1])))
+        if failure is not None:
+            failures.append(name)
+    if failures:
+        raise AssertionError('pixel mismatch: ' + ', '.join(failures))
@@ -0,0 +1,275 @@
+# MicroPython Driver TFT queued SPI transfers
+import time
+
+
+class _QueueSPI(object):
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def write(self, data):
+        self.queue.put(data)
+
+
+class _QueuePin(object):
+
+    def __init__(self, state=1):
+        self.state = state
+
+    def value(self, state=None):
+        if state is None:
+            return self.state
+        self.state = state
+
+
+class TransferQueue(object):
+    """
+    Queue between a Driver and its SPI bus.
+
+    attach() puts stand-ins for spi, dc and cs into the driver, so every
+    write is recorded as a command or data block together with the DC
+    level instead of being sent. Bulk fills are recorded as (count,
+    color) and not expanded. Data is copied when queued, since the driver
+    reuses its buffers, blocks larger than max_bytes are written straight
+    from the caller's buffer once the queue is drained. Consecutive data
+    blocks are joined up to MERGE_LIMIT bytes into one write.
+
+    A drain sends everything queued so far with CS asserted once and DC
+    only switched where it changes. Drain with flush(), the uasyncio task
+    run(), or start_thread() on ports with _thread. Rendering overlaps
+    with the transfer only if spi.write lets other code run meanwhile,
+    i.e. with the thread on ports whose SPI driver releases the GIL. On a
+    single core without that it only saves CS and DC toggles, the number
+    of SPI writes stays about the same for drawing.
+
+    Before more than max_bytes would be queued, counting fills by the
+    bytes they send, put blocks until the queue is sent.
+    detach() drains and restores the driver, do that before reset().
+    """
+
+    MERGE_LIMIT = 512
+    MAX_BYTES = 4096
+
+    def __init__(self, drv, max_bytes=None):
+        self.drv = drv
+        self.max_bytes = max_bytes or TransferQueue.MAX_BYTES
+        self.ops = []
+        self.queued = 0
+        self.attached = False
+        self.running = False
+        self._lock = None
+        self._event = None
+        self._busy = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.puts = 0
+        self.writes = 0
+        self.bursts = 0
+
+    def stats(self):
+        """
+        Return (writes queued, spi writes sent, CS bursts).
+        """
+        return (self.puts, self.writes, self.bursts)
+
+    def attach(self):
+        if self.attached:
+            return
+        drv = self.drv
+        self._spi = drv.spi
+        self._dc = drv.dc
+        self._cs = drv.cs
+        self._dc_pin = _QueuePin(0)
+        drv.spi = _QueueSPI(self)
+        drv.dc = self._dc_pin
+        drv.cs = _QueuePin()
+        self._write_pixels = drv.write_pixels
+        drv.write_pixels = self.put_fill
+        drv.invalidate_state()
+        self.attached = True
+
+    def detach(self):
+        if not self.attached:
+            return
+        self.stop()
+        self.flush()
+        drv = self.drv
+        drv.spi = self._spi
+        drv.dc = self._dc
+        drv.cs = self._cs
+        del drv.write_pixels
+        drv.invalidate_state()
+        self.attached = False
+
+    def put(self, data):
+        """
+        Queue one SPI write, a command if DC is low.
+        """
+        self.puts += 1
+        self._queue(1 if self._dc_pin.state else 0, data, 0)
+
+    def put_fill(self, count, color):
+        """
+        Queue count pixels of a 2 byte color, replaces drv.write_pixels.
+        """
+        if getattr(self.drv, 'framebuffer', None) is not None:
+            # buffered TFT, the pixels go to the framebuffer
+            self._write_pixels(count, color)
+            return
+        self.puts += 1
+        self._queue(2, color, count)
+
+    def _queue(self, kind, data, count):
+        size = count * 2 if kind == 2 else len(data)
+        if self.queued + size > self.max_bytes:
+            self._wait()
+            if kind != 2 and size > self.max_bytes:
+                # too large to copy, e.g. a framebuffer flush
+                self._direct(kind, data)
+                return
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        ops = self.ops
+        last = ops[-1] if ops else None
+        if kind == 1 and last is not None and last[0] == 1 and len(last[1]) + len(data) <= TransferQueue.MERGE_LIMIT:
+            # more data for the same command
+            last[1].extend(data)
+        elif kind == 2:
+            ops.append((2, bytes(data), count))
+        else:
+            ops.append((kind, bytearray(data)))
+        self.queued += size
+        if lock is not None:
+            lock.release()
+        if self._event is not None:
+            # wake the drain task
+            self._event.set()
+
+    def _direct(self, kind, data):
+        # the queue is empty, holding the lock keeps the drain thread off the bus
+        lock = self._lock
+        if lock is not None:
+            lock.acquire()
+        try:
+            self._send(((kind, data),))
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def _take(self):
+        if self._lock is not None:
+            self._lock.acquire()
+        ops = self.ops
+        self.ops = []
+        self.queued = 0
+        self._busy = bool(ops)
+        if self._lock is not None:
+            self._lock.release()
+        return ops
+
+    def _send(self, ops):
+        if not ops:
+            return
+        drv = self.drv
+        spi = self._spi
+        dc = self._dc
+        level = None
+        self._cs.value(0)
+        for op in ops:
+            kind = op[0]
+            if (kind != 0) != level:
+                level = kind != 0
+                dc.value(1 if level else 0)
+            if kind == 2:
+                # the driver fill buffer is only used here while attached
+                drv._prepare_fill(op[1])
+                chunk = drv.fill_chunk
+                for _ in range(op[2] // chunk):
+                    spi.write(drv._fill_buf)
+                rest = op[2] % chunk
+                self.writes += op[2] // chunk
+                if rest:
+                    spi.write(drv._fill_mv[:rest * 2])
+                    self.writes += 1
+            else:
+                spi.write(op[1])
+                self.writes += 1
+        self._cs.value(1)
+        self.bursts += 1
+        self._busy = False
+
+    def flush(self):
+        """
+        Send everything queued now, or wait for the drain thread to.
+        """
+        if self.running and self._lock is not None:
+            self._wait()
+            return
+        self._send(self._take())
+
+    def _wait(self):
+        if not (self.running and self._lock is not None):
+            self._send(self._take())
+            return
+        while self.ops or self._busy:
+            time.sleep_ms(0)
+
+    async def run(self):
+        """
+        uasyncio task draining the queue whenever other tasks yield. It
+        waits on an Event while the queue is empty.
+        """
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        self._event = asyncio.Event()
+        self.running = True
+        try:
+            while self.running:
+                ops = self._take()
+                if ops:
+                    self._send(ops)
+                    await asyncio.sleep(0)
+                else:
+                    # only other tasks queue data, nothing can arrive in between
+                    self._event.clear()
+                    await self._event.wait()
+        finally:
+            self._event = None
+
+    def start_thread(self):
+        """
+        Drain from a second thread, returns False if the port has none.
+        """
+        try:
+            import _thread
+        except ImportError:
+            return False
+        self._lock = _thread.allocate_lock()
+        self.running = True
+        _thread.start_new_thread(self._worker, ())
+        return True
+
+    def _worker(self):
+        while self.running:
+            ops = self._take()
+            if ops:
+                self._send(ops)
+            else:
+                time.sleep_ms(1)
+        self._lock = None
+
+    def stop(self):
+        """
+        Stop the drain task or thread, anything left is sent by flush.
+        """
+        if self._lock is not None:
+            self._wait()
+        self.running = False
+        if self._event is not None:
+            self._event.set()
+        while self._lock is not None:
+            time.sleep_ms(1)
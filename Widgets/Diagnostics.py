@@ -4,22 +4,59 @@ import math
 
 class TFTStatusLogger():
 
+    LINE_HEIGHT = 10
 
-    def __init__( self, oTFT ):
+    def __init__( self, oTFT, bScroll = True ):
         self.m_oTFT = oTFT
         self.m_oYPos = 0
+        self.m_nLine = 0
+        self.m_nLines = oTFT.height // TFTStatusLogger.LINE_HEIGHT
+        # hardware scrolling follows the panel rows, so only without row swap/flip
+        self.m_bScroll = bScroll and not ( oTFT.orientation & 0xA0 )
 
     def init( self ):
         self.m_oTFT.Clear( Display.COLOR_BLACK )
+        self.m_oYPos = 0
+        self.m_nLine = 0
+        if self.m_bScroll:
+            self.m_oTFT.scroll_area( 0, self.m_nLines * TFTStatusLogger.LINE_HEIGHT )
+            self.m_oTFT.scroll( 0 )
 
     def LogTaskStart( self, sText ):
-        self.m_oTFT.Text( 0, self.m_oYPos, sText, Fonts.terminalfont, Display.COLOR_WHITE, 1 )
+        self.m_oTFT.Text( 0, self.m_oYPos, sText, Fonts.terminalfont, Display.COLOR_WHITE, 1, Display.COLOR_BLACK )
 
 
     def LogTaskResult( self, bResult):
         if bResult:
-            self.m_oTFT.Text( 90, self.m_oYPos, "[OK]", Fonts.terminalfont, Display.COLOR_GREEN, 1 )
+            self.m_oTFT.Text( 90, self.m_oYPos, "[OK]", Fonts.terminalfont, Display.COLOR_GREEN, 1, Display.COLOR_BLACK )
         else:
-            self.m_oTFT.Text( 90, self.m_oYPos, "[NOK]", Fonts.terminalfont, Display.COLOR_RED, 1 )
-
-        self.m_oYPos += 10
+            self.m_oTFT.Text( 90, self.m_oYPos, "[NOK]", Fonts.terminalfont, Display.COLOR_RED, 1, Display.COLOR_BLACK )
+
+        self._NextLine()
+
+    def LogLine( self, sText ):
+        self.m_oTFT.Text( 0, self.m_oYPos, sText, Fonts.terminalfont, Display.COLOR_WHITE, 1, Display.COLOR_BLACK )
+        self._NextLine()
+
+    def _NextLine( self ):
+        # ring buffer of lines, once full the oldest line is cleared and reused
+        self.m_nLine += 1
+        nSlot = self.m_nLine % self.m_nLines
+        self.m_oYPos = nSlot * TFTStatusLogger.LINE_HEIGHT
+        if self.m_nLine < self.m_nLines:
+            return
+
+        self.m_oTFT.Rect( 0, self.m_oYPos, self.m_oTFT.width, TFTStatusLogger.LINE_HEIGHT, Display.COLOR_BLACK )
+        if self.m_bScroll:
+            # move the reused line to the bottom
+            self.m_oTFT.scroll( ( ( nSlot + 1 ) % self.m_nLines ) * TFTStatusLogger.LINE_HEIGHT )
+
+    def SetLowPower( self, bEnabled ):
+        """
+        Switch the panel to partial mode, showing only the rows in use.
+        """
+        if not bEnabled:
+            self.m_oTFT.partial()
+            return
+        nRows = min( self.m_nLine + 1, self.m_nLines ) * TFTStatusLogger.LINE_HEIGHT
+        self.m_oTFT.partial( 0, nRows - 1 )
@@ -15,11 +15,33 @@ class Thermometer():
     SCALE_MARK_MAJOR_WIDTH = 5
     SCALE_MARK_MINOR_WIDTH = 2
 
-    def __init__( self, tft ):
+    LABEL_X = 10
+    LABEL_Y = 10
+    LABEL_SIZE = 2
+
+    WIDTH = 128
+    HEIGHT = 160
+
+    def __init__( self, tft, nX = 0, nY = 0 ):
         self.tft = tft
+        self.m_nX = nX
+        self.m_nY = nY
         self.nCurrentTemperature = Thermometer.END_TEMP
+        self.m_nFillTop = None
+        self.m_sLabel = ''
 
     def init( self ):
+        # the scale is drawn blank, the next reading paints fill and label in full
+        self.m_nFillTop = None
+        self.m_sLabel = ''
+        # draw relative to the widget origin
+        self.tft.PushViewport( self.m_nX, self.m_nY, Thermometer.WIDTH, Thermometer.HEIGHT )
+        try:
+            self._DrawScale()
+        finally:
+            self.tft.PopClip()
+
+    def _DrawScale( self ):
 
         nCircleMidPointY = Thermometer.Y_END - Thermometer.DECORATOR_CIRCLE_RADIUS
         self.nScaleWidth = int( ( Thermometer.DECORATOR_CIRCLE_RADIUS / 2 ) - 2 ) * 2
@@ -51,7 +73,7 @@ class Thermometer():
             # Mainscale
             self.tft.HLine( self.nScaleStartX - Thermometer.SCALE_MARK_MAJOR_WIDTH, self.nScaleStartY + self.nPixelsPerDegree * nPos, Thermometer.SCALE_MARK_MAJOR_WIDTH, Display.COLOR_BLACK ) # Mainscale
             # Scaletext
-            self.tft.Text( self.nScaleStartX - 20, self.nScaleStartY - 3 + self.nPixelsPerDegree * nPos, str( Thermometer.END_TEMP - nPos), Fonts.terminalfont, 1 )
+            self.tft.Text( self.nScaleStartX - 20, self.nScaleStartY - 3 + self.nPixelsPerDegree * nPos, str( Thermometer.END_TEMP - nPos), Fonts.terminalfont, Display.COLOR_BLACK, 1, Display.COLOR_WHITE )
             # Helperscale
             if nPos > 0:
                 self.tft.HLine( self.nScaleStartX - Thermometer.SCALE_MARK_MINOR_WIDTH,
@@ -62,29 +84,48 @@ class Thermometer():
         self.nScaleHeight = self.nScaleEndY - self.nScaleStartY
 
     def SetTemperature( self, nTemp ):
-        if nTemp == self.nCurrentTemperature:
+        if nTemp == self.nCurrentTemperature and self.m_nFillTop is not None:
             return
+        self.nCurrentTemperature = nTemp
 
-
-
-        #if nTemp > self.nCurrentTemperature:
         fMinorScaleAmount = divmod( nTemp, 1)
         nFillHeight = int( self.nPixelsPerDegree * ( int( fMinorScaleAmount[0] ) - Thermometer.BEGIN_TEMP ) ) + round( self.nPixelsPerDegree * fMinorScaleAmount[1] )
-        print( nTemp )
-        print( fMinorScaleAmount )
-
-        # Clear Scale
-        self.tft.Rect( self.nScaleStartX + 1, self.nScaleStartY, self.nScaleWidth - 1, self.nScaleHeight, Display.COLOR_WHITE )
-
-        # Clear temp reading
-        #self.tft.Rect( self.nScaleStartX + 1 + self.nScaleWidth, self.nScaleStartY, self.nScaleWidth - 1, self.nScaleHeight, Display.COLOR_WHITE )
-
-        #redraw scale according to temp
-        self.tft.Rect( self.nScaleStartX + 1, self.nScaleStartY + ( self.nScaleHeight - nFillHeight), self.nScaleWidth - 1, nFillHeight + + self.nPixelsPerDegree, Display.COLOR_CRIMSON )
-
-        # render hline and text
-        #self.tft.HLine( self.nScaleStartX + 1 + self.nScaleWidth, self.nScaleStartY + ( self.nScaleHeight - nFillHeight), Thermometer.SCALE_MARK_MINOR_WIDTH, Display.COLOR_BLACK )
 
-        #self.tft.Text( self.nScaleStartX + 1 + self.nScaleWidth + Thermometer.SCALE_MARK_MINOR_WIDTH, self.nScaleStartY + ( self.nScaleHeight - nFillHeight) - 3, str( nTemp ), Fonts.terminalfont, 1 )
-        self.tft.Rect( 10, 10, 30, 30,  Display.COLOR_WHITE )
-        self.tft.Text( 10, 10, str( nTemp ), Fonts.terminalfont, 2 )
+        # the fill always reaches down into the bulb, only its top moves
+        nFillBottom = self.nScaleStartY + self.nScaleHeight + self.nPixelsPerDegree
+        nFillTop = min( max( self.nScaleStartY + self.nScaleHeight - nFillHeight, self.nScaleStartY ), nFillBottom )
+
+        self.tft.PushViewport( self.m_nX, self.m_nY, Thermometer.WIDTH, Thermometer.HEIGHT )
+        try:
+            self._DrawFill( nFillTop, nFillBottom )
+            self._DrawLabel( str( nTemp ) )
+        finally:
+            self.tft.PopClip()
+
+    def _DrawFill( self, nFillTop, nFillBottom ):
+        nX = self.nScaleStartX + 1
+        nWidth = self.nScaleWidth - 1
+        if self.m_nFillTop is None:
+            self.tft.Rect( nX, self.nScaleStartY, nWidth, nFillTop - self.nScaleStartY, Display.COLOR_WHITE )
+            self.tft.Rect( nX, nFillTop, nWidth, nFillBottom - nFillTop, Display.COLOR_CRIMSON )
+        elif nFillTop < self.m_nFillTop:
+            # rising, paint the strip between the levels
+            self.tft.Rect( nX, nFillTop, nWidth, self.m_nFillTop - nFillTop, Display.COLOR_CRIMSON )
+        elif nFillTop > self.m_nFillTop:
+            # falling, clear the strip between the levels
+            self.tft.Rect( nX, self.m_nFillTop, nWidth, nFillTop - self.m_nFillTop, Display.COLOR_WHITE )
+        self.m_nFillTop = nFillTop
+
+    def _DrawLabel( self, sLabel ):
+        # redraw only the characters which changed since the last reading
+        nAdvance = Thermometer.LABEL_SIZE * Fonts.terminalfont['width'] + 1
+        for nIndex in range( len( sLabel ) ):
+            if nIndex < len( self.m_sLabel ) and self.m_sLabel[nIndex] == sLabel[nIndex]:
+                continue
+            self.tft.Text( Thermometer.LABEL_X + nIndex * nAdvance, Thermometer.LABEL_Y, sLabel[nIndex], Fonts.terminalfont,
+                           Display.COLOR_BLACK, Thermometer.LABEL_SIZE, Display.COLOR_WHITE )
+
+        if len( sLabel ) < len( self.m_sLabel ):
+            self.tft.Rect( Thermometer.LABEL_X + len( sLabel ) * nAdvance, Thermometer.LABEL_Y, ( len( self.m_sLabel ) - len( sLabel ) ) * nAdvance,
+                           Fonts.terminalfont['height'] * Thermometer.LABEL_SIZE, Display.COLOR_WHITE )
+        self.m_sLabel = sLabel
@@ -0,0 +1,178 @@
+import utime
+
+def _Intersect( tA, tB ):
+    nX0 = max( tA[0], tB[0] )
+    nY0 = max( tA[1], tB[1] )
+    nX1 = min( tA[2], tB[2] )
+    nY1 = min( tA[3], tB[3] )
+    if nX0 > nX1 or nY0 > nY1:
+        return None
+    return ( nX0, nY0, nX1, nY1 )
+
+def _Contains( tOuter, tInner ):
+    return tOuter[0] <= tInner[0] and tOuter[1] <= tInner[1] and tOuter[2] >= tInner[2] and tOuter[3] >= tInner[3]
+
+def _Subtract( tRect, tCut ):
+    """
+    Return the parts of tRect outside tCut as up to four rects.
+    """
+    tInner = _Intersect( tRect, tCut )
+    if tInner is None:
+        return [ tRect ]
+    lParts = []
+    if tRect[1] < tInner[1]:
+        lParts.append( ( tRect[0], tRect[1], tRect[2], tInner[1] - 1 ) )
+    if tInner[3] < tRect[3]:
+        lParts.append( ( tRect[0], tInner[3] + 1, tRect[2], tRect[3] ) )
+    if tRect[0] < tInner[0]:
+        lParts.append( ( tRect[0], tInner[1], tInner[0] - 1, tInner[3] ) )
+    if tInner[2] < tRect[2]:
+        lParts.append( ( tInner[2] + 1, tInner[1], tRect[2], tInner[3] ) )
+    return lParts
+
+class Widget():
+    """
+    Base class of retained widgets.
+
+    A widget has fixed bounds (x0, y0, x1, y1, inclusive), calls Invalidate
+    when its state changes and draws itself in Render when the scheduler
+    asks for it. An opaque widget paints every pixel of its bounds, which
+    lets the scheduler skip widgets fully below it.
+    """
+
+    def __init__( self, nX, nY, nWidth, nHeight, bOpaque = True ):
+        self.m_tBounds = ( nX, nY, nX + nWidth - 1, nY + nHeight - 1 )
+        self.m_bOpaque = bOpaque
+        self.m_oScheduler = None
+
+    def Invalidate( self, tRect = None ):
+        if self.m_oScheduler is not None:
+            self.m_oScheduler.Invalidate( tRect or self.m_tBounds )
+
+    def Render( self, oTFT, tRect ):
+        """
+        Draw the part of the widget inside tRect. Drawing is clipped to
+        tRect, so a widget may simply redraw all of itself.
+        """
+        pass
+
+class RenderScheduler():
+    """
+    Collects invalidated regions and redraws them in one pass per frame.
+
+    Overlapping and touching regions are merged, widgets are drawn bottom
+    to top in the order they were added, and a widget whose part of a
+    region is covered by an opaque widget above it is skipped. Tick does
+    at most one pass per frame interval, so several updates in the same
+    tick share one redraw.
+
+    The parts of a region no opaque widget covers are filled with the
+    background color first, so removed widgets and the old state of
+    transparent ones are erased.
+    """
+
+    def __init__( self, oTFT, nMaxFps = 10, nBackground = 0x0000 ):
+        self.m_oTFT = oTFT
+        self.m_nBackground = nBackground
+        self.m_lWidgets = []
+        self.m_lDirty = []
+        self.m_nFrameInterval = 1000 // nMaxFps
+        self.m_nLastFrame = None
+        self.m_nFrames = 0
+        self.m_nRenders = 0
+        self.m_nSkipped = 0
+
+    def Add( self, oWidget ):
+        self.m_lWidgets.append( oWidget )
+        oWidget.m_oScheduler = self
+        oWidget.Invalidate()
+
+    def Remove( self, oWidget ):
+        self.m_lWidgets.remove( oWidget )
+        oWidget.m_oScheduler = None
+        self.Invalidate( oWidget.m_tBounds )
+
+    def Invalidate( self, tRect ):
+        tRect = _Intersect( tRect, ( 0, 0, self.m_oTFT.width - 1, self.m_oTFT.height - 1 ) )
+        if tRect is None:
+            return
+
+        bMerged = True
+        while bMerged:
+            bMerged = False
+            for tDirty in self.m_lDirty:
+                if tRect[0] <= tDirty[2] + 1 and tDirty[0] <= tRect[2] + 1 and tRect[1] <= tDirty[3] + 1 and tDirty[1] <= tRect[3] + 1:
+                    self.m_lDirty.remove( tDirty )
+                    tRect = ( min( tRect[0], tDirty[0] ), min( tRect[1], tDirty[1] ), max( tRect[2], tDirty[2] ), max( tRect[3], tDirty[3] ) )
+                    bMerged = True
+                    break
+        self.m_lDirty.append( tRect )
+
+    def Tick( self ):
+        """
+        Render a frame if regions are dirty and the frame interval has passed.
+
+        Returns True if a frame was rendered.
+        """
+        if not self.m_lDirty:
+            return False
+        nNow = utime.ticks_ms()
+        if self.m_nLastFrame is not None and utime.ticks_diff( nNow, self.m_nLastFrame ) < self.m_nFrameInterval:
+            return False
+        self.m_nLastFrame = nNow
+        self.Render()
+        return True
+
+    def Render( self ):
+        """
+        Redraw all dirty regions now.
+        """
+        lDirty = self.m_lDirty
+        self.m_lDirty = []
+        lWidgets = self.m_lWidgets
+
+        for tDirty in lDirty:
+            for tRect in self._Uncovered( tDirty ):
+                self.m_oTFT.Rect( tRect[0], tRect[1], tRect[2] - tRect[0] + 1, tRect[3] - tRect[1] + 1, self.m_nBackground )
+
+        for nIndex in range( len( lWidgets ) ):
+            oWidget = lWidgets[nIndex]
+            for tDirty in lDirty:
+                tRect = _Intersect( oWidget.m_tBounds, tDirty )
+                if tRect is None:
+                    continue
+                if self._IsCovered( tRect, nIndex ):
+                    self.m_nSkipped += 1
+                    continue
+                # the widget may draw all of itself, the clip keeps it inside tRect
+                self.m_oTFT.PushClip( tRect[0], tRect[1], tRect[2] - tRect[0] + 1, tRect[3] - tRect[1] + 1 )
+                try:
+                    oWidget.Render( self.m_oTFT, tRect )
+                finally:
+                    self.m_oTFT.PopClip()
+                self.m_nRenders += 1
+
+        self.m_oTFT.flush()
+        self.m_nFrames += 1
+
+    def _IsCovered( self, tRect, nIndex ):
+        for oAbove in self.m_lWidgets[nIndex + 1:]:
+            if oAbove.m_bOpaque and _Contains( oAbove.m_tBounds, tRect ):
+                return True
+        return False
+
+    def _Uncovered( self, tRect ):
+        lParts = [ tRect ]
+        for oWidget in self.m_lWidgets:
+            if oWidget.m_bOpaque:
+                lRest = []
+                for tPart in lParts:
+                    lRest.extend( _Subtract( tPart, oWidget.m_tBounds ) )
+                lParts = lRest
+        return lParts
+
+    def GetStats( self ):
+        """
+        Return ( frames, widget renders, skipped covered widgets ).
+        """
+        return ( self.m_nFrames, self.m_nRenders, self.m_nSkipped )